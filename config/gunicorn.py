@@ -0,0 +1,90 @@
+"""
+Production serving profile:
+
+    gunicorn -c config/gunicorn.py
+
+Every value can be overridden from the environment. GUNICORN_WORKER_CLASS picks the worker model:
+'sync' (default), 'gthread', or 'uvicorn' for ASGI on uvicorn workers (needs the uvicorn package).
+
+Workers must share a cache for invalidations to reach all of them, so this profile defaults
+CACHE_BACKEND to 'file'; set CACHE_BACKEND=redis and REDIS_URL when Redis is available.
+"""
+import gc
+import os
+
+os.environ.setdefault('CACHE_BACKEND', 'file')
+
+
+def cpu_count():
+    # Respect CPU affinity/cgroup pinning where the platform exposes it.
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+cores = cpu_count()
+worker_model = os.environ.get('GUNICORN_WORKER_CLASS', 'sync')
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+if worker_model == 'uvicorn':
+    wsgi_app = 'config.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+    workers = int(os.environ.get('WEB_CONCURRENCY', cores))
+elif worker_model == 'gthread':
+    wsgi_app = 'config.wsgi:application'
+    worker_class = 'gthread'
+    threads = int(os.environ.get('GUNICORN_THREADS', 4))
+    workers = int(os.environ.get('WEB_CONCURRENCY', cores + 1))
+else:
+    wsgi_app = 'config.wsgi:application'
+    worker_class = 'sync'
+    # Sync workers block on I/O, so run a couple per core.
+    workers = int(os.environ.get('WEB_CONCURRENCY', cores * 2 + 1))
+
+# Load Django once in the master; workers share those pages copy-on-write.
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+# Recycle workers to bound slow memory growth; jitter keeps them from restarting together.
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', max_requests // 10))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-') or None
+errorlog = '-'
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    # Import what the first request would otherwise load in every worker: the URLconf and all views.
+    from importlib import import_module
+    from django.urls import get_resolver
+    get_resolver().url_patterns
+    import_module('core.views')
+    # Build the suggest index and country list once here; forked workers inherit them.
+    import_module('core.warmup').warm_caches()
+    from django.db import connections
+    connections.close_all()
+    # Move everything loaded so far out of the GC's reach so collections in workers don't touch
+    # (and un-share) those pages.
+    gc.freeze()
+
+
+def post_worker_init(worker):
+    # Without preload every worker loads the app itself; warm before it takes its first request.
+    if not preload_app:
+        from core.warmup import warm_caches
+        warm_caches()
+        from django.db import connections
+        connections.close_all()
+
+
+def post_fork(server, worker):
+    # Never share a database connection opened in the master.
+    from django.db import connections
+    connections.close_all()
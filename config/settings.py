@@ -30,8 +30,11 @@ ALLOWED_HOSTS = []
 
 # Application definition
 
+# 'storefront' workers serve only the shop: no admin site and no editor, so they boot faster and smaller.
+DEPLOYMENT_ROLE = os.environ.get('DEPLOYMENT_ROLE', 'all')
+ADMIN_ENABLED = DEPLOYMENT_ROLE != 'storefront'
+
 INSTALLED_APPS = [
-    'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
@@ -39,15 +42,16 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
 
     'core',
-    'django_ckeditor_5',
 ]
+if ADMIN_ENABLED:
+    INSTALLED_APPS += ['django.contrib.admin', 'django_ckeditor_5']
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.CachedAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -64,6 +68,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'core.page_cache.csrf_placeholder',
             ],
         },
     },
@@ -79,6 +84,9 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'timeout': 20,
+        },
     }
 }
 
@@ -115,6 +123,51 @@ USE_TZ = True
 
 AUTH_USER_MODEL = 'core.User'
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+# The user cache, page cache tags, search index version and country list all invalidate through
+# this cache, so anything that runs more than one process (gunicorn, the task worker) needs a
+# shared backend: 'redis' (REDIS_URL, needs the redis package) or 'file' (CACHE_LOCATION).
+# 'locmem' is per process and only suitable for runserver and tests.
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+CACHES = {
+    'default': {
+        'locmem': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+        'file': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_LOCATION', BASE_DIR / 'cache'),
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        },
+        'redis': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/1'),
+        },
+    }[CACHE_BACKEND]
+}
+
+# Sessions: 'db', 'cached_db' or 'signed_cookies'
+# https://docs.djangoproject.com/en/5.2/topics/http/sessions/#configuring-the-session-engine
+
+SESSION_MODE = os.environ.get('SESSION_MODE', 'cached_db')
+SESSION_ENGINE = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}[SESSION_MODE]
+
+# Seconds an authenticated user stays cached; dropped whenever the user is saved
+USER_CACHE_TIMEOUT = 300
+
+# Email; in development run `python manage.py debug_smtpd` as the SMTP server
+# https://docs.djangoproject.com/en/5.2/topics/email/
+
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 1025))
+DEFAULT_FROM_EMAIL = 'Organic <noreply@organic.local>'
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
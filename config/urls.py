@@ -1,16 +1,21 @@
 from django.conf.urls.static import static
-from django.contrib import admin
 from django.urls import path, include
 
 from config import settings
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
     path('', include('core.urls')),
-    path("ckeditor5/", include('django_ckeditor_5.urls')),
 ]
 
+if settings.ADMIN_ENABLED:
+    from django.contrib import admin
+
+    urlpatterns += [
+        path('admin/', admin.site.urls),
+        path("ckeditor5/", include('django_ckeditor_5.urls')),
+    ]
+
 
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
-    urlpatterns += static(settings.STATIC_URL, document_root=settings.STATICFILES_DIRS[0])
\ No newline at end of file
+    urlpatterns += static(settings.STATIC_URL, document_root=settings.STATICFILES_DIRS[0])
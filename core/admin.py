@@ -1,7 +1,20 @@
+from datetime import timedelta
+from decimal import Decimal
 
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Sum, Max
+from django.http import StreamingHttpResponse, FileResponse, JsonResponse
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils import timezone
 
-from core.models import *
+from core.exports import order_rows, csv_lines, xlsx_file
+from core.models import User, Subscription, PostCategory, ProductCategory, ProductImage, Product, CustomerReview, \
+    Tag, ProductTags, Promotion, Country, OrderBilling, Promocode, Order, OrderItem, StockReservation, Post, Favourite, \
+    PostComment, PostTags, Task, DailySales
+from core.queue import enqueue
+from core.ratings import refresh_ratings
 
 
 # Register your models here.
@@ -28,11 +41,26 @@ class ProductImageAdmin(admin.ModelAdmin):
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    pass
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if 'featured_image' in form.changed_data:
+            enqueue('process_product_image', product_id=obj.pk)
 
 @admin.register(CustomerReview)
 class CustomerReviewAdmin(admin.ModelAdmin):
-    pass
+    def save_model(self, request, obj, form, change):
+        old_product_id = CustomerReview.objects.filter(pk=obj.pk).values_list('product_id', flat=True).first()
+        super().save_model(request, obj, form, change)
+        refresh_ratings({obj.product_id_id, old_product_id})
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        refresh_ratings([obj.product_id_id])
+
+    def delete_queryset(self, request, queryset):
+        product_ids = set(queryset.values_list('product_id', flat=True))
+        super().delete_queryset(request, queryset)
+        refresh_ratings(product_ids)
 
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
@@ -42,6 +70,11 @@ class TagAdmin(admin.ModelAdmin):
 class ProductTagsAdmin(admin.ModelAdmin):
     pass
 
+@admin.register(Promotion)
+class PromotionAdmin(admin.ModelAdmin):
+    list_display = ('name', 'percent_off', 'category', 'starts_at', 'ends_at', 'is_active', 'is_live')
+    filter_horizontal = ('products',)
+
 @admin.register(Country)
 class CountryAdmin(admin.ModelAdmin):
     pass
@@ -56,12 +89,32 @@ class PromocodeAdmin(admin.ModelAdmin):
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
-    pass
+    actions = ['export_csv', 'export_xlsx']
+
+    @admin.action(description='Export selected orders as CSV')
+    def export_csv(self, request, queryset):
+        response = StreamingHttpResponse(csv_lines(order_rows(queryset.values('pk'))), content_type='text/csv')
+        response['Content-Disposition'] = 'attachment; filename="orders.csv"'
+        return response
+
+    @admin.action(description='Export selected orders as XLSX')
+    def export_xlsx(self, request, queryset):
+        try:
+            fileobj = xlsx_file(order_rows(queryset.values('pk')))
+        except ImproperlyConfigured as e:
+            self.message_user(request, str(e), messages.ERROR)
+            return None
+        return FileResponse(fileobj, as_attachment=True, filename='orders.xlsx',
+                            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
 
 @admin.register(OrderItem)
 class OrderItemAdmin(admin.ModelAdmin):
     pass
 
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    pass
+
 @admin.register(Post)
 class PostAdmin(admin.ModelAdmin):
     pass
@@ -76,4 +129,59 @@ class PostCommentAdmin(admin.ModelAdmin):
 
 @admin.register(PostTags)
 class PostTagsAdmin(admin.ModelAdmin):
-    pass
\ No newline at end of file
+    pass
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'priority', 'attempts', 'run_at')
+    list_filter = ('status', 'name')
+
+@admin.register(DailySales)
+class DailySalesAdmin(admin.ModelAdmin):
+    list_display = ['day', 'dimension', 'label', 'revenue', 'discount', 'units', 'orders']
+    list_filter = ['dimension']
+    date_hierarchy = 'day'
+    change_list_template = 'admin/core/dailysales/change_list.html'
+
+    def get_urls(self):
+        return [
+            path('dashboard/', self.admin_site.admin_view(self.dashboard_view), name='core_dailysales_dashboard'),
+        ] + super().get_urls()
+
+    def dashboard_view(self, request):
+        try:
+            days = max(1, min(int(request.GET.get('days', 30)), 366))
+        except ValueError:
+            days = 30
+        since = timezone.localdate() - timedelta(days=days - 1)
+        rollups = DailySales.objects.filter(day__gte=since)
+        totals = {'revenue': Sum('revenue'), 'discount': Sum('discount'), 'units': Sum('units'), 'orders': Sum('orders')}
+
+        def money(row):
+            # SQLite sums decimals without rounding them back to cents.
+            revenue, discount = [(row[f] or Decimal(0)).quantize(Decimal('0.01')) for f in ('revenue', 'discount')]
+            row.update(revenue=revenue, discount=discount, net_revenue=revenue - discount, units=row['units'] or 0,
+                       orders=row['orders'] or 0)
+            if row['orders']:
+                row['average_order_value'] = (row['net_revenue'] / row['orders']).quantize(Decimal('0.01'))
+            return row
+
+        def breakdown(dimension):
+            rows = rollups.filter(dimension=dimension).values('key').annotate(label=Max('label'), **totals)
+            return [money(row) for row in rows.order_by('-revenue')]
+
+        daily = [
+            {'day': row.day, 'revenue': row.revenue, 'net_revenue': row.net_revenue, 'units': row.units,
+             'orders': row.orders, 'average_order_value': row.average_order_value}
+            for row in rollups.filter(dimension=DailySales.Dimension.TOTAL).order_by('day')
+        ]
+        summary = money(rollups.filter(dimension=DailySales.Dimension.TOTAL).aggregate(**totals))
+        data = {
+            'since': since, 'days': days, 'summary': summary, 'daily': daily,
+            'categories': breakdown(DailySales.Dimension.CATEGORY),
+            'promocodes': breakdown(DailySales.Dimension.PROMOCODE),
+        }
+        if request.GET.get('format') == 'json':
+            return JsonResponse(data)
+        context = {**self.admin_site.each_context(request), **data, 'opts': self.model._meta, 'title': 'Sales dashboard',
+                   'ranges': [7, 30, 90, 365]}
+        return TemplateResponse(request, 'admin/core/dailysales/dashboard.html', context)
@@ -0,0 +1,106 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction, IntegrityError
+from django.db.models import F, Sum, Count, DecimalField, ExpressionWrapper
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from core.models import DailySales, OrderBilling, OrderItem
+
+CENT = Decimal('0.01')
+
+# (dimension, key lookup, label lookup) on OrderItem; the total row has no key.
+DIMENSIONS = [
+    (DailySales.Dimension.TOTAL, None, None),
+    (DailySales.Dimension.CATEGORY, 'product__category_id', 'product__category_id__name'),
+    (DailySales.Dimension.PROMOCODE, 'order__promocode__code', 'order__promocode__code'),
+]
+
+
+def aggregate_sales(billings):
+    """
+    Rollup rows for the given billings, keyed by (day, dimension, key). Each dimension is one grouped
+    query; grouping also by promocode percent lets the discount be worked out per group in Python.
+    """
+    lines = OrderItem.objects.filter(order__order_billing__in=billings).annotate(
+        day=TruncDate('order__order_billing__paid_at'),
+        line_total=ExpressionWrapper(Coalesce('unit_price', 'product__effective_price') * F('quantity'),
+                                     output_field=DecimalField(max_digits=14, decimal_places=2)),
+        percent=Coalesce('order__promocode__discount_percent', 0),
+    ).order_by()
+
+    rows = {}
+    for dimension, key, label in DIMENSIONS:
+        queryset = lines.filter(**{f'{key}__isnull': False}) if key else lines
+        fields = dict.fromkeys(['day', 'percent', key, label] if key else ['day', 'percent'])
+        grouped = queryset.values(*fields).annotate(revenue=Sum('line_total'), units=Sum('quantity'),
+                                                    orders=Count('order', distinct=True))
+        for group in grouped:
+            row = rows.setdefault((group['day'], dimension, str(group[key]) if key else ''), {
+                'label': group[label] if key else 'All', 'revenue': Decimal(0), 'discount': Decimal(0),
+                'units': 0, 'orders': 0,
+            })
+            row['revenue'] += group['revenue']
+            row['discount'] += (group['revenue'] * group['percent'] / 100).quantize(CENT)
+            row['units'] += group['units']
+            # An order has one promocode, so the percent groups never share an order.
+            row['orders'] += group['orders']
+    return rows
+
+
+def _increment(lookup, row):
+    return DailySales.objects.filter(**lookup).update(
+        label=row['label'],
+        revenue=F('revenue') + row['revenue'],
+        discount=F('discount') + row['discount'],
+        units=F('units') + row['units'],
+        orders=F('orders') + row['orders'],
+    )
+
+
+def record_sale(billing_id):
+    """Add a completed billing to the rollups. The rolled_up flag makes a repeated call a no-op."""
+    with transaction.atomic():
+        claimed = OrderBilling.objects.filter(
+            pk=billing_id, payment_status=OrderBilling.PaymentStatus.COMPLETED, paid_at__isnull=False, rolled_up=False,
+        ).update(rolled_up=True)
+        if not claimed:
+            return
+        for (day, dimension, key), row in aggregate_sales([billing_id]).items():
+            lookup = {'day': day, 'dimension': dimension, 'key': key}
+            if _increment(lookup, row):
+                continue
+            try:
+                with transaction.atomic():
+                    DailySales.objects.create(**lookup, **row)
+            except IntegrityError:
+                # Another sale created the row first.
+                _increment(lookup, row)
+
+
+def rebuild(start, end):
+    """Recompute the rollups for days start..end (inclusive) from the completed billings."""
+    tz = timezone.get_current_timezone()
+    billings = OrderBilling.objects.filter(
+        payment_status=OrderBilling.PaymentStatus.COMPLETED,
+        paid_at__gte=datetime.combine(start, time.min, tzinfo=tz),
+        paid_at__lt=datetime.combine(end + timedelta(days=1), time.min, tzinfo=tz),
+    )
+    with transaction.atomic():
+        # Delete first so the write lock is held before the billings are read.
+        DailySales.objects.filter(day__range=(start, end)).delete()
+        rows = aggregate_sales(billings.values('pk'))
+        DailySales.objects.bulk_create([
+            DailySales(day=day, dimension=dimension, key=key, **row) for (day, dimension, key), row in rows.items()
+        ])
+        billings.filter(rolled_up=False).update(rolled_up=True)
+    return len(rows)
+
+
+def date_partitions(start, end, days):
+    if days < 1:
+        raise ValueError('Partitions must span at least one day.')
+    while start <= end:
+        yield start, min(start + timedelta(days=days - 1), end)
+        start += timedelta(days=days)
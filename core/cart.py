@@ -0,0 +1,82 @@
+import json
+
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils.functional import cached_property
+
+from core.models import Order, OrderItem, Product
+
+CART_COOKIE = 'cart'
+CART_SALT = 'core.cart'
+CART_MAX_AGE = 60 * 60 * 24 * 14
+CART_MAX_ITEMS = 50
+
+
+def open_order(user):
+    """The user's unbilled order with its items and their products loaded in one extra query."""
+    return Order.objects.filter(user=user, order_billing=None).select_related('promocode') \
+        .prefetch_related(Prefetch('order_items', queryset=OrderItem.objects.select_related('product'))) \
+        .order_by('-id').first()
+
+
+class GuestCart:
+    """Cart for anonymous visitors, kept in a signed cookie so browsing never writes to the DB."""
+
+    def __init__(self, items=None):
+        self.items = items or {}
+
+    @classmethod
+    def from_request(cls, request):
+        try:
+            items = json.loads(request.get_signed_cookie(CART_COOKIE, default='{}', salt=CART_SALT))
+            items = {int(product_id): int(quantity) for product_id, quantity in items.items()}
+        except (TypeError, ValueError, AttributeError):
+            items = {}
+        return cls({product_id: quantity for product_id, quantity in items.items() if quantity > 0})
+
+    def add(self, product_id, quantity):
+        if product_id in self.items or len(self.items) < CART_MAX_ITEMS:
+            self.items[product_id] = self.items.get(product_id, 0) + quantity
+
+    def save(self, response):
+        response.set_signed_cookie(
+            CART_COOKIE, json.dumps(self.items), salt=CART_SALT, max_age=CART_MAX_AGE, httponly=True, samesite='Lax'
+        )
+
+    @staticmethod
+    def clear(response):
+        response.delete_cookie(CART_COOKIE, samesite='Lax')
+
+    @cached_property
+    def order_items(self):
+        # Unsaved OrderItems, so the offcanvas cart template renders them like DB rows.
+        products = Product.objects.in_bulk(self.items.keys())
+        return [
+            OrderItem(product=products[product_id], quantity=quantity)
+            for product_id, quantity in self.items.items() if product_id in products
+        ]
+
+    @property
+    def total_price(self):
+        total = 0
+        for item in self.order_items:
+            total += item.product.price * item.quantity
+        return total
+
+    def merge_into(self, user):
+        if not self.items:
+            return
+        with transaction.atomic():
+            order, created = Order.objects.get_or_create(user=user, order_billing=None)
+            product_ids = Product.objects.filter(id__in=self.items.keys()).values_list('id', flat=True)
+            existing = dict(order.order_items.filter(product_id__in=product_ids).values_list('product_id', 'quantity'))
+            OrderItem.objects.bulk_create(
+                [
+                    OrderItem(order=order, product_id=product_id,
+                              quantity=existing.get(product_id, 0) + self.items[product_id])
+                    for product_id in product_ids
+                ],
+                update_conflicts=True,
+                unique_fields=['order', 'product'],
+                update_fields=['quantity'],
+            )
@@ -0,0 +1,77 @@
+from django.db import transaction, IntegrityError
+
+from core.inventory import commit_reservations, OutOfStock
+from core.models import Order, OrderBilling, OrderItem
+from core.pricing import validate_promocode, redeem_promocode, PromocodeError
+from core.payments import submit_payment
+
+
+class CheckoutError(Exception):
+    pass
+
+
+def _placed(user, idempotency_key):
+    # Scoped to the user: keys come from the form, and another account's key must not return its billing.
+    return OrderBilling.objects.filter(idempotency_key=idempotency_key, orders_billing__user=user).first()
+
+
+def place_order(user, billing, idempotency_key):
+    """
+    Turn the user's open order into a billed one and hand the payment to the provider.
+
+    `billing` is an unsaved OrderBilling from the checkout form. Submitting the same
+    idempotency key again returns the billing created the first time.
+    """
+    existing = _placed(user, idempotency_key)
+    if existing:
+        return existing
+
+    try:
+        with transaction.atomic():
+            order = Order.objects.select_for_update().select_related('promocode').filter(user=user, order_billing=None).first()
+            items = list(order.order_items.select_related('product')) if order else []
+            if not items:
+                # A concurrent submit with the same key may have billed the order while we waited for the lock.
+                existing = _placed(user, idempotency_key)
+                if existing:
+                    return existing
+                raise CheckoutError('Your cart is empty.')
+
+            try:
+                commit_reservations(order, items)
+            except OutOfStock as e:
+                name = next(item.product.name for item in items if item.product_id == e.product_id)
+                raise CheckoutError(f'Sorry, {name} is out of stock.')
+
+            for item in items:
+                item.unit_price = item.product.price
+            OrderItem.objects.bulk_update(items, ['unit_price'])
+
+            if order.promocode:
+                try:
+                    validate_promocode(order.promocode, order.total_price)
+                    redeem_promocode(order.promocode)
+                except PromocodeError as e:
+                    raise CheckoutError(str(e))
+
+            billing.idempotency_key = idempotency_key
+            billing.payment_status = OrderBilling.PaymentStatus.PENDING
+            billing.save()
+            order.order_billing = billing
+            order.save(update_fields=['order_billing'])
+            if billing.saveAsDefaultAdress:
+                user.billing_address = billing
+                user.save(update_fields=['billing_address'])
+
+            # Queued in the same transaction, so the worker only sees billings that were committed.
+            submit_payment(billing.pk)
+    except IntegrityError:
+        # A concurrent submit with the same key won the race.
+        existing = _placed(user, idempotency_key)
+        if existing:
+            return existing
+        if OrderBilling.objects.filter(idempotency_key=idempotency_key).exists():
+            # The key belongs to someone else's order; never hand that back.
+            raise CheckoutError('This checkout form has expired, please submit it again.')
+        raise
+    return billing
@@ -0,0 +1,96 @@
+import csv
+import tempfile
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import F, DecimalField, ExpressionWrapper
+from django.db.models.functions import Coalesce
+
+from core.models import OrderItem
+
+CHUNK_SIZE = 2000
+
+# One row per order line, joined with the order's user, billing and country.
+ORDER_COLUMNS = [
+    ('Order', 'order_id'),
+    ('Customer email', 'order__user__email'),
+    ('First name', 'order__order_billing__first_name'),
+    ('Last name', 'order__order_billing__last_name'),
+    ('Address', 'order__order_billing__address'),
+    ('Country', 'order__order_billing__country_id__name'),
+    ('State', 'order__order_billing__state'),
+    ('Zip', 'order__order_billing__zip'),
+    ('Payment type', 'order__order_billing__payment_type'),
+    ('Payment status', 'order__order_billing__payment_status'),
+    ('Payment reference', 'order__order_billing__payment_reference'),
+    ('Promocode', 'order__promocode__code'),
+    ('Product', 'product__name'),
+    ('SKU', 'product__sku'),
+    ('Quantity', 'quantity'),
+    ('Unit price', 'price'),
+    ('Line total', 'line_total'),
+]
+ORDER_HEADER = [header for header, lookup in ORDER_COLUMNS]
+# Spreadsheet apps run cells starting with these as formulas; names and addresses are customer input.
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def order_rows(orders=None, chunk_size=CHUNK_SIZE):
+    """
+    Yield export rows for placed orders as plain tuples. values_list + iterator keeps memory flat:
+    no model instances, and rows are fetched from the cursor chunk_size at a time.
+    """
+    items = OrderItem.objects.filter(order__order_billing__isnull=False)
+    if orders is not None:
+        items = items.filter(order__in=orders)
+    items = items.annotate(price=Coalesce('unit_price', 'product__effective_price'))
+    items = items.annotate(line_total=ExpressionWrapper(F('price') * F('quantity'), output_field=DecimalField(max_digits=12, decimal_places=2)))
+    yield from items.order_by('order_id', 'id').values_list(*[lookup for header, lookup in ORDER_COLUMNS]) \
+        .iterator(chunk_size=chunk_size)
+
+
+def safe_cell(value):
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def safe_row(row):
+    return [safe_cell(value) for value in row]
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows, header=ORDER_HEADER):
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(safe_row(row))
+
+
+def workbook_class():
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise ImproperlyConfigured('XLSX export requires openpyxl (pip install openpyxl).')
+    return Workbook
+
+
+def write_xlsx(rows, fileobj, header=ORDER_HEADER):
+    # Write-only workbooks stream rows to a temp file instead of building the sheet in memory.
+    workbook = workbook_class()(write_only=True)
+    sheet = workbook.create_sheet('Orders')
+    sheet.append(header)
+    for row in rows:
+        sheet.append(safe_row(row))
+    workbook.save(fileobj)
+
+
+def xlsx_file(rows, header=ORDER_HEADER):
+    """The finished workbook as a rewound temp file; XLSX is a zip, so it can't be sent before it's complete."""
+    fileobj = tempfile.TemporaryFile()
+    write_xlsx(rows, fileobj, header)
+    fileobj.seek(0)
+    return fileobj
@@ -0,0 +1,148 @@
+from decimal import Decimal
+from urllib.parse import urlencode
+
+from django.db.models import Count, Q, F, Case, When, Value, IntegerField
+
+from core.models import Product, ProductCategory, ProductTags, Tag
+
+PRICE_BUCKETS = [
+    (None, 10, 'Less than $10'),
+    (10, 20, '$10 - $20'),
+    (20, 30, '$20 - $30'),
+    (30, 40, '$30 - $40'),
+    (40, 50, '$40 - $50'),
+    (50, None, '$50 and more'),
+]
+RATINGS = [4, 3, 2, 1]
+SORTS = {
+    'name': ('name', 'Name (A - Z)'),
+    '-name': ('-name', 'Name (Z - A)'),
+    'price': ('effective_price', 'Price (Low-High)'),
+    '-price': ('-effective_price', 'Price (High-Low)'),
+    'newest': ('-id', 'Newest'),
+}
+FACETS = ('category', 'tag', 'price', 'rating', 'on_sale')
+
+
+def _price_q(index):
+    low, high, label = PRICE_BUCKETS[index]
+    q = Q()
+    if low is not None:
+        q &= Q(effective_price__gte=Decimal(low))
+    if high is not None:
+        q &= Q(effective_price__lt=Decimal(high))
+    return q
+
+
+def parse_filters(params):
+    """Selected facet values from a QueryDict; anything malformed is ignored."""
+    def ints(key, valid=None):
+        values = []
+        for value in params.getlist(key):
+            if value.isdigit() and (valid is None or int(value) in valid):
+                values.append(int(value))
+        return values
+
+    return {
+        'category': ints('category'),
+        'tag': ints('tag'),
+        'price': ints('price', range(len(PRICE_BUCKETS))),
+        'rating': ints('rating', RATINGS)[:1],
+        'on_sale': params.get('on_sale') == '1',
+    }
+
+
+def apply_filters(queryset, filters, exclude=None):
+    """
+    Filter by every selected facet except `exclude`. Values within one facet are OR'ed,
+    facets are AND'ed.
+    """
+    if filters['category'] and exclude != 'category':
+        queryset = queryset.filter(category_id__in=filters['category'])
+    if filters['tag'] and exclude != 'tag':
+        queryset = queryset.filter(pk__in=ProductTags.objects.filter(tag_id__in=filters['tag']).values('product_id'))
+    if filters['price'] and exclude != 'price':
+        q = Q()
+        for index in filters['price']:
+            q |= _price_q(index)
+        queryset = queryset.filter(q)
+    if filters['rating'] and exclude != 'rating':
+        queryset = queryset.filter(rating_count__gt=0, rating_sum__gte=F('rating_count') * filters['rating'][0])
+    if filters['on_sale'] and exclude != 'on_sale':
+        queryset = queryset.filter(effective_price__lt=F('original_price'))
+    return queryset
+
+
+def facet_counts(filters, base=None):
+    """
+    Counts for every facet value under the other selected facets, so each sidebar option
+    shows how many products selecting it would add. One grouped query per facet.
+    """
+    base = Product.objects.all() if base is None else base
+    counts = {}
+
+    counts['category'] = dict(
+        apply_filters(base, filters, 'category').order_by().values_list('category_id').annotate(n=Count('id'))
+    )
+    counts['tag'] = dict(
+        ProductTags.objects.filter(product_id__in=apply_filters(base, filters, 'tag').values('pk'))
+        .order_by().values_list('tag_id').annotate(n=Count('product_id', distinct=True))
+    )
+    price_bucket = Case(
+        *[When(_price_q(index), then=Value(index)) for index in range(len(PRICE_BUCKETS))],
+        output_field=IntegerField(),
+    )
+    counts['price'] = dict(
+        apply_filters(base, filters, 'price').filter(effective_price__isnull=False).order_by()
+        .annotate(bucket=price_bucket).values_list('bucket').annotate(n=Count('id'))
+    )
+    rated = apply_filters(base, filters, 'rating').order_by().aggregate(
+        **{f'r{stars}': Count('id', filter=Q(rating_count__gt=0, rating_sum__gte=F('rating_count') * stars))
+           for stars in RATINGS}
+    )
+    counts['rating'] = {stars: rated[f'r{stars}'] for stars in RATINGS}
+    counts['on_sale'] = apply_filters(base, filters, 'on_sale').filter(effective_price__lt=F('original_price')).count()
+    return counts
+
+
+def _url(filters, sort, **changes):
+    selected = {**filters, **changes}
+    params = []
+    for key in ('category', 'tag', 'price', 'rating'):
+        params.extend((key, value) for value in selected[key])
+    if selected['on_sale']:
+        params.append(('on_sale', 1))
+    if sort:
+        params.append(('sort', sort))
+    return '?' + urlencode(params)
+
+
+def _toggle(values, value):
+    return [v for v in values if v != value] if value in values else values + [value]
+
+
+def sidebar(filters, sort=None):
+    """Facet options ready for the template: label, count, link that toggles it and whether it is active."""
+    counts = facet_counts(filters)
+
+    def option(facet, value, label, count, single=False):
+        values = filters[facet]
+        toggled = ([] if value in values else [value]) if single else _toggle(values, value)
+        return {'label': label, 'count': count, 'active': value in values,
+                'url': _url(filters, sort, **{facet: toggled})}
+
+    tag_ids = counts['tag'].keys() | set(filters['tag'])
+    return {
+        'category': [option('category', c.pk, c.name, counts['category'].get(c.pk, 0))
+                     for c in ProductCategory.objects.order_by('name')],
+        'tag': [option('tag', t.pk, t.name, counts['tag'].get(t.pk, 0))
+                for t in Tag.objects.filter(pk__in=tag_ids).order_by('name')],
+        'price': [option('price', i, label, counts['price'].get(i, 0))
+                  for i, (low, high, label) in enumerate(PRICE_BUCKETS)],
+        'rating': [option('rating', stars, f'{stars} stars & up', counts['rating'][stars], single=True)
+                   for stars in RATINGS],
+        'on_sale': {'label': 'On sale', 'count': counts['on_sale'], 'active': filters['on_sale'],
+                    'url': _url(filters, sort, on_sale=not filters['on_sale'])},
+        'sorts': [{'label': label, 'value': key, 'active': key == sort} for key, (field, label) in SORTS.items()],
+        'clear_url': _url({'category': [], 'tag': [], 'price': [], 'rating': [], 'on_sale': False}, sort),
+    }
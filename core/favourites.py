@@ -0,0 +1,35 @@
+from django.db import transaction
+
+from core.models import Favourite, Product
+
+MAX_SYNC = 500
+
+
+def add_favourites(user, product_ids):
+    """
+    INSERT ... ON CONFLICT DO NOTHING on (product, user): adding a favourite that is already there,
+    or two adds racing each other, leaves exactly one row.
+    """
+    existing = Product.objects.filter(pk__in=set(product_ids)).values_list('pk', flat=True)
+    Favourite.objects.bulk_create([Favourite(user=user, product_id=pk) for pk in existing], ignore_conflicts=True)
+
+
+def remove_favourites(user, product_ids):
+    Favourite.objects.filter(user=user, product_id__in=set(product_ids)).delete()
+
+
+def sync_favourites(user, add=(), remove=(), replace=None):
+    """
+    Apply a client-side wishlist in one go: `replace` sets the exact list, `add`/`remove` adjust it
+    (an id in both `remove` and `add` or `replace` ends up removed).
+    Returns the user's favourite product ids afterwards.
+    """
+    with transaction.atomic():
+        if replace is not None:
+            Favourite.objects.filter(user=user).exclude(product_id__in=set(replace)).delete()
+            add = [*add, *replace]
+        if add:
+            add_favourites(user, add)
+        if remove:
+            remove_favourites(user, remove)
+        return list(Favourite.objects.filter(user=user).order_by('id').values_list('product_id', flat=True))
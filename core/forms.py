@@ -1,9 +1,10 @@
 
 from django.contrib.auth.hashers import make_password
-from django.forms import CharField, Form
+from django.forms import CharField, Form, HiddenInput, TypedChoiceField, RadioSelect, Select
 from django.forms.models import ModelForm
 
-from core.models import Subscription, User
+from core.models import Subscription, User, OrderBilling, PostComment, CustomerReview
+from core.reference_data import country_choices
 
 
 class SubscriptionForm(ModelForm):
@@ -24,3 +25,38 @@ class RegisterModelForm(ModelForm):
 class LoginForm(Form):
     email=CharField(max_length=255, required=True)
     password=CharField(max_length=255, required=True)
+
+
+class PostCommentForm(ModelForm):
+    class Meta:
+        model = PostComment
+        fields = ('text',)
+
+
+class CustomerReviewForm(ModelForm):
+    rating = TypedChoiceField(choices=[(i, i) for i in range(1, 6)], coerce=int, widget=RadioSelect)
+
+    class Meta:
+        model = CustomerReview
+        fields = ('rating', 'text')
+
+
+class CheckoutForm(ModelForm):
+    idempotency_key = CharField(max_length=64, widget=HiddenInput)
+    # Choices come from the per-worker country cache and the id is copied onto the billing as is:
+    # a ModelChoiceField would query Country to render the select and again to validate it.
+    country_id = TypedChoiceField(choices=country_choices, coerce=int, required=False, empty_value=None,
+                                  widget=Select(attrs={'class': 'form-select'}))
+
+    class Meta:
+        model = OrderBilling
+        fields = ('first_name', 'last_name', 'address', 'address_2', 'state', 'zip',
+                  'is_shipping_address_same', 'payment_type', 'saveAsDefaultAdress')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['address_2'].required = False
+
+    def save(self, commit=True):
+        self.instance.country_id_id = self.cleaned_data['country_id']
+        return super().save(commit)
@@ -0,0 +1,84 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.models import Product, StockReservation
+
+RESERVATION_TTL = timedelta(minutes=15)
+
+
+class OutOfStock(Exception):
+    def __init__(self, product_id):
+        super().__init__(f'Product {product_id} is out of stock.')
+        self.product_id = product_id
+
+
+def _take(product_id, quantity):
+    # Conditional decrement: the row is only touched when enough stock is left,
+    # so concurrent buyers never need to lock and re-read it.
+    if Product.objects.filter(pk=product_id, stock__gte=quantity).update(stock=F('stock') - quantity):
+        return True
+    if Product.objects.filter(pk=product_id, stock__isnull=True).exists():
+        return False
+    raise OutOfStock(product_id)
+
+
+def _give_back(totals):
+    for product_id, quantity in totals.items():
+        Product.objects.filter(pk=product_id, stock__isnull=False).update(stock=F('stock') + quantity)
+
+
+def reserve(product_id, quantity, order=None):
+    """Hold `quantity` units for a cart. Returns None for products without stock tracking."""
+    with transaction.atomic():
+        if not _take(product_id, quantity):
+            return None
+        return StockReservation.objects.create(
+            product_id=product_id, order=order, quantity=quantity, expires_at=timezone.now() + RESERVATION_TTL
+        )
+
+
+def commit_reservations(order, items):
+    """
+    Turn the order's reservations into sold stock at checkout, topping up holds that
+    have expired or fall short of the item quantity. Call inside the checkout transaction.
+    """
+    # Lock with a plain row query and total in Python: PostgreSQL rejects FOR UPDATE with GROUP BY.
+    reservations = list(StockReservation.objects.select_for_update().filter(order=order).values_list('pk', 'product_id', 'quantity'))
+    held = defaultdict(int)
+    for pk, product_id, quantity in reservations:
+        held[product_id] += quantity
+    surplus = defaultdict(int)
+    for item in items:
+        missing = item.quantity - held.pop(item.product_id, 0)
+        if missing > 0:
+            _take(item.product_id, missing)
+        elif missing < 0:
+            surplus[item.product_id] -= missing
+    for product_id, quantity in held.items():
+        surplus[product_id] += quantity
+    StockReservation.objects.filter(pk__in=[pk for pk, product_id, quantity in reservations]).delete()
+    _give_back(surplus)
+
+
+def release_expired(batch_size=500):
+    """Return stock held by expired reservations, one short transaction per batch."""
+    released = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                StockReservation.objects.select_for_update(skip_locked=True)
+                .filter(expires_at__lte=timezone.now())
+                .values_list('pk', 'product_id', 'quantity')[:batch_size]
+            )
+            if not batch:
+                return released
+            totals = defaultdict(int)
+            for pk, product_id, quantity in batch:
+                totals[product_id] += quantity
+            StockReservation.objects.filter(pk__in=[pk for pk, product_id, quantity in batch]).delete()
+            _give_back(totals)
+        released += len(batch)
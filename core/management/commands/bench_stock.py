@@ -0,0 +1,55 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection, OperationalError
+
+from core.inventory import reserve, OutOfStock
+from core.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Hammer one hot product with concurrent buyers and check that stock never oversells.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--buyers', type=int, default=300)
+        parser.add_argument('--stock', type=int, default=100)
+        parser.add_argument('--threads', type=int, default=32)
+
+    def handle(self, *args, **options):
+        product = Product.objects.create(
+            name='bench-hot-sku', sku='BENCH-HOT', description='', original_price=1,
+            featured_image='featured_image/bench.png', stock=options['stock'],
+        )
+
+        def buy(_):
+            try:
+                reserve(product.pk, 1)
+                return 'ok'
+            except OutOfStock:
+                return 'sold_out'
+            except OperationalError:
+                return 'error'
+            finally:
+                connection.close()
+
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+                results = list(pool.map(buy, range(options['buyers'])))
+            elapsed = time.perf_counter() - started
+
+            product.refresh_from_db()
+            sold = results.count('ok')
+            reserved = product.stock_reservations.count()
+            self.stdout.write(
+                f"buyers={options['buyers']} stock={options['stock']} sold={sold} "
+                f"sold_out={results.count('sold_out')} errors={results.count('error')} "
+                f"left={product.stock} elapsed={elapsed:.3f}s rate={options['buyers'] / elapsed:.0f}/s"
+            )
+            if sold > options['stock'] or sold != reserved or product.stock != options['stock'] - sold:
+                self.stderr.write(self.style.ERROR('Stock accounting mismatch: oversold!'))
+            else:
+                self.stdout.write(self.style.SUCCESS('No oversell.'))
+        finally:
+            product.delete()
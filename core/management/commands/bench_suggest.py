@@ -0,0 +1,57 @@
+import random
+import string
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.search_index import PrefixIndex
+
+WORDS = ['organic', 'green', 'apple', 'banana', 'milk', 'yogurt', 'honey', 'almond', 'bread', 'cheese',
+         'tomato', 'orange', 'juice', 'fresh', 'sweet', 'corn', 'chicken', 'rice', 'tea', 'coffee']
+
+
+class Command(BaseCommand):
+    help = 'Build a synthetic type-ahead index and report build time and query latency percentiles.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=100_000)
+        parser.add_argument('--queries', type=int, default=10_000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--no-warm', dest='warm', action='store_false',
+                            help='Skip PrefixIndex.warm(), to measure first hits on broad prefixes.')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        size = options['size']
+        entries = [
+            ('product', pk, ' '.join(rng.sample(WORDS, 2) + [''.join(rng.choices(string.ascii_lowercase, k=6))]),
+             rng.randint(0, 10_000))
+            for pk in range(size)
+        ]
+
+        index = PrefixIndex()
+        started = time.perf_counter()
+        index.bulk_load(entries)
+        self.stdout.write(f'built {len(index)} entries in {time.perf_counter() - started:.2f}s')
+
+        if options['warm']:
+            started = time.perf_counter()
+            memoized = index.warm()
+            self.stdout.write(f'warmed {memoized} prefixes in {time.perf_counter() - started:.2f}s')
+
+        started = time.perf_counter()
+        for pk in range(100):
+            index.add('product', size + pk, f'bench item {pk}', 1)
+        self.stdout.write(f'incremental add: {(time.perf_counter() - started) * 10:.3f} ms/item')
+
+        for length in (1, 2, 3, 5):
+            timings = []
+            for _ in range(options['queries']):
+                label = rng.choice(entries)[2]
+                word = rng.choice(label.split())
+                started = time.perf_counter()
+                index.search(word[:length])
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            p50, p99 = timings[len(timings) // 2], timings[int(len(timings) * 0.99)]
+            self.stdout.write(f'prefix len {length}: p50={p50:.3f} ms p99={p99:.3f} ms max={timings[-1]:.3f} ms')
@@ -0,0 +1,55 @@
+import socketserver
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP to accept mail from Django and print a line per message."""
+
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        self.reply('220 localhost debug SMTP')
+        recipients = []
+        while line := self.rfile.readline():
+            command = line.decode(errors='replace').strip()
+            verb = command[:4].upper()
+            if verb in ('HELO', 'EHLO'):
+                self.reply('250 localhost')
+            elif verb == 'RCPT':
+                recipients.append(command.split(':', 1)[1].strip())
+                self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                size = 0
+                while (data := self.rfile.readline()) not in (b'.\r\n', b''):
+                    size += len(data)
+                self.server.received += 1
+                self.server.log(f'message #{self.server.received} to {", ".join(recipients)} ({size} bytes)')
+                recipients = []
+                self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('250 OK')
+
+
+class Command(BaseCommand):
+    help = 'Run a local SMTP server that accepts and discards mail, for development.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=settings.EMAIL_PORT)
+
+    def handle(self, *args, **options):
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        with socketserver.ThreadingTCPServer(('127.0.0.1', options['port']), SMTPHandler) as server:
+            server.received = 0
+            server.log = self.stdout.write
+            self.stdout.write(f"Debug SMTP server listening on 127.0.0.1:{options['port']}")
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
@@ -0,0 +1,40 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from core.exports import order_rows, csv_lines, write_xlsx, workbook_class
+from core.models import Order, OrderBilling
+
+
+class Command(BaseCommand):
+    help = 'Export placed orders, one row per order line, as CSV or XLSX.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=['csv', 'xlsx'], default='csv')
+        parser.add_argument('--output', '-o', help='File to write; CSV goes to stdout when omitted.')
+        parser.add_argument('--status', choices=OrderBilling.PaymentStatus.values)
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        orders = None
+        if options['status']:
+            orders = Order.objects.filter(order_billing__payment_status=options['status']).values('pk')
+        rows = order_rows(orders, chunk_size=options['chunk_size'])
+
+        if options['format'] == 'xlsx':
+            if not options['output']:
+                raise CommandError('--output is required for XLSX.')
+            # Checked before opening --output so a missing dependency doesn't leave an empty file behind.
+            try:
+                workbook_class()
+            except ImproperlyConfigured as e:
+                raise CommandError(str(e))
+            with open(options['output'], 'wb') as fileobj:
+                write_xlsx(rows, fileobj)
+            return
+
+        if not options['output']:
+            for line in csv_lines(rows):
+                self.stdout.write(line, ending='')
+            return
+        with open(options['output'], 'w', newline='', encoding='utf-8') as out:
+            out.writelines(csv_lines(rows))
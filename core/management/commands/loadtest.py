@@ -0,0 +1,114 @@
+import http.client
+import importlib.util
+import os
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def _client(host, port, path, duration):
+    """One load-generating process: keep-alive GETs until the deadline. Returns (latencies, errors)."""
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+    conn = http.client.HTTPConnection(host, port, timeout=10)
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            conn.request('GET', path, headers={'Host': 'localhost'})
+            response = conn.getresponse()
+            response.read()
+            if response.status >= 500:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - start)
+            if response.will_close:
+                conn.close()
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+    conn.close()
+    return latencies, errors
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_up(host, port, path, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=2)
+            conn.request('GET', path, headers={'Host': 'localhost'})
+            conn.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError(f'Server on {host}:{port} did not come up.')
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure requests/sec against a running server (--url), or start gunicorn with config/gunicorn.py once '
+        'per --workers value and compare how throughput scales. The load generator runs on the same machine, '
+        'so leave it cores of its own.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help='Benchmark an already running server instead of starting gunicorn.')
+        parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+        parser.add_argument('--worker-class', default='sync', choices=['sync', 'gthread', 'uvicorn'])
+        parser.add_argument('--path', default='/')
+        parser.add_argument('--clients', type=int, default=8, help='Concurrent client processes.')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds per run.')
+
+    def measure(self, host, port, path, clients, duration):
+        with ProcessPoolExecutor(max_workers=clients) as pool:
+            results = list(pool.map(_client, *zip(*[(host, port, path, duration)] * clients)))
+        latencies = sorted(latency for run, errors in results for latency in run)
+        errors = sum(errors for run, errors in results)
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else 0
+
+        return {'rps': len(latencies) / duration, 'p50': percentile(0.5), 'p99': percentile(0.99), 'errors': errors}
+
+    def report(self, label, stats, baseline=None):
+        speedup = f"  x{stats['rps'] / baseline:.2f}" if baseline else ''
+        self.stdout.write(f"{label:>12}  {stats['rps']:8.1f} req/s  p50 {stats['p50']:7.1f} ms  "
+                          f"p99 {stats['p99']:7.1f} ms  errors {stats['errors']}{speedup}")
+
+    def handle(self, *args, **options):
+        if options['url']:
+            url = urlsplit(options['url'])
+            path = url.path or '/'
+            _wait_until_up(url.hostname, url.port or 80, path)
+            self.report(url.netloc, self.measure(url.hostname, url.port or 80, path, options['clients'], options['duration']))
+            return
+
+        if importlib.util.find_spec('gunicorn') is None:
+            raise CommandError('gunicorn is not installed; install it or benchmark a running server with --url.')
+
+        baseline = None
+        for workers in options['workers']:
+            port = _free_port()
+            env = {**os.environ, 'WEB_CONCURRENCY': str(workers), 'GUNICORN_BIND': f'127.0.0.1:{port}',
+                   'GUNICORN_WORKER_CLASS': options['worker_class'], 'GUNICORN_ACCESS_LOG': ''}
+            server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'config/gunicorn.py'],
+                                      cwd=settings.BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                _wait_until_up('127.0.0.1', port, options['path'])
+                stats = self.measure('127.0.0.1', port, options['path'], options['clients'], options['duration'])
+            finally:
+                server.terminate()
+                server.wait()
+            self.report(f'{workers} workers', stats, baseline)
+            baseline = baseline or stats['rps']
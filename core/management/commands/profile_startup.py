@@ -0,0 +1,87 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter so nothing is imported yet: boot the WSGI app the way a worker does,
+# serve one request, and report timings and peak RSS.
+CHILD = '''
+import json, resource, sys, time
+from io import BytesIO
+from wsgiref.util import setup_testing_defaults
+
+start = time.perf_counter()
+from config.wsgi import application
+booted = time.perf_counter()
+
+environ = {'PATH_INFO': sys.argv[1], 'HTTP_HOST': sys.argv[2], 'wsgi.input': BytesIO()}
+setup_testing_defaults(environ)
+status = []
+body = b''.join(application(environ, lambda s, headers, exc_info=None: status.append(s)))
+done = time.perf_counter()
+
+print(json.dumps({
+    'boot_ms': (booted - start) * 1000,
+    'first_request_ms': (done - booted) * 1000,
+    'status': status[0],
+    'bytes': len(body),
+    'rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'modules': len(sys.modules),
+}))
+'''
+
+
+def parse_importtime(stderr):
+    """(module, self_us, cumulative_us) for every line of `python -X importtime` output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        rows.append((module.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+class Command(BaseCommand):
+    help = 'Measure worker start-up: import time per module, time to first request and peak RSS.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--role', action='append', choices=['all', 'storefront'],
+                            help='Deployment role to profile; repeat to compare. Defaults to the current one.')
+        parser.add_argument('--path', default='/', help='URL of the first request.')
+        parser.add_argument('--host', default='localhost', help='Host header; must be in ALLOWED_HOSTS.')
+        parser.add_argument('--top', type=int, default=15, help='How many of the slowest imports to list.')
+        parser.add_argument('--runs', type=int, default=3, help='Runs per role; the fastest is reported.')
+
+    def run_child(self, role, path, host):
+        env = {**os.environ, 'DEPLOYMENT_ROLE': role, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'config.settings')}
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', CHILD, path, host],
+                                cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+        if result.returncode:
+            raise CommandError(result.stderr.strip().splitlines()[-1])
+        return json.loads(result.stdout.strip().splitlines()[-1]), parse_importtime(result.stderr)
+
+    def handle(self, *args, **options):
+        for role in options['role'] or [settings.DEPLOYMENT_ROLE]:
+            runs = [self.run_child(role, options['path'], options['host']) for _ in range(max(1, options['runs']))]
+            stats, imports = min(runs, key=lambda run: run[0]['boot_ms'] + run[0]['first_request_ms'])
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f'Role: {role}'))
+            self.stdout.write(f"  boot (import + django.setup): {stats['boot_ms']:.0f} ms")
+            self.stdout.write(f"  first request {options['path']}: {stats['first_request_ms']:.0f} ms ({stats['status']})")
+            self.stdout.write(f"  peak RSS: {stats['rss_kb'] / 1024:.1f} MB, {stats['modules']} modules loaded")
+
+            # Top-level packages only, so `django.contrib.admin.*` shows up as one line per package.
+            packages = {}
+            for module, self_us, cumulative_us in imports:
+                package = '.'.join(module.split('.')[:3] if module.startswith('django.') else module.split('.')[:1])
+                packages[package] = packages.get(package, 0) + self_us
+            self.stdout.write(f'  slowest packages (self time):')
+            for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:options['top']]:
+                self.stdout.write(f'    {self_us / 1000:8.1f} ms  {package}')
+            self.stdout.write(f'  slowest modules (cumulative):')
+            for module, self_us, cumulative_us in sorted(imports, key=lambda row: -row[2])[:options['top']]:
+                self.stdout.write(f'    {cumulative_us / 1000:8.1f} ms  {module}')
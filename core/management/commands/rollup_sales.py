@@ -0,0 +1,52 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Min
+from django.utils import timezone
+
+from core.analytics import rebuild, date_partitions
+from core.models import OrderBilling
+
+
+def _rebuild(start, end):
+    try:
+        return rebuild(start, end)
+    finally:
+        # Each worker thread has its own connection.
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily sales rollups for a date range, several partitions at a time.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=date.fromisoformat, help='First day (YYYY-MM-DD); defaults to the first sale.')
+        parser.add_argument('--until', type=date.fromisoformat, help='Last day (YYYY-MM-DD); defaults to today.')
+        parser.add_argument('--partition-days', type=int, default=7)
+        parser.add_argument('--workers', type=int, default=4)
+
+    def handle(self, *args, **options):
+        if options['partition_days'] < 1:
+            raise CommandError('--partition-days must be at least 1.')
+        if options['workers'] < 1:
+            raise CommandError('--workers must be at least 1.')
+        since = options['since']
+        if since is None:
+            first = OrderBilling.objects.filter(paid_at__isnull=False).aggregate(first=Min('paid_at'))['first']
+            if first is None:
+                self.stdout.write('No completed sales to roll up.')
+                return
+            since = timezone.localdate(first)
+        until = options['until'] or timezone.localdate()
+        if since > until:
+            raise CommandError('--since is after --until.')
+
+        partitions = list(date_partitions(since, until, options['partition_days']))
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            futures = {pool.submit(_rebuild, start, end): (start, end) for start, end in partitions}
+            for future in as_completed(futures):
+                start, end = futures[future]
+                self.stdout.write(f'{start} .. {end}: {future.result()} rows')
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {len(partitions)} partitions from {since} to {until}.'))
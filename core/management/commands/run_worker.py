@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+import core.tasks  # noqa: F401  registers the task functions
+from core.queue import run_worker
+
+
+class Command(BaseCommand):
+    help = 'Run queued background tasks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=4, help='Number of worker threads.')
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+        parser.add_argument('--once', action='store_true', help='Exit when no task is due.')
+
+    def handle(self, *args, **options):
+        try:
+            run_worker(options['concurrency'], options['poll_interval'], options['once'])
+        except KeyboardInterrupt:
+            pass
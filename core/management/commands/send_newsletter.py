@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from core.queue import enqueue
+
+
+class Command(BaseCommand):
+    help = 'Queue a newsletter for every subscriber.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('subject')
+        parser.add_argument('body')
+
+    def handle(self, *args, **options):
+        task = enqueue('send_newsletter', subject=options['subject'], body=options['body'])
+        self.stdout.write(f'Queued task {task.pk}.')
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.pricing import sync_promotions, recalculate_effective_prices
+
+
+class Command(BaseCommand):
+    help = 'Start and end scheduled promotions and reprice the products they cover.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Recalculate every product price from scratch.')
+        parser.add_argument('--interval', type=float, default=0.0,
+                            help='Keep running and check every INTERVAL seconds.')
+
+    def handle(self, *args, **options):
+        if options['all']:
+            self.stdout.write(f'Repriced {recalculate_effective_prices()} products.')
+            return
+        while True:
+            self.stdout.write(f'Repriced {sync_promotions()} products.')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.core.cache import cache
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject
+
+
+def user_cache_key(user_id):
+    return f'auth-user:{user_id}'
+
+
+def get_cached_user(request):
+    # Same checks as auth.get_user: a cached user only counts if the session's auth hash still
+    # matches it, so sessions started before a password change fall through and get logged out.
+    if not hasattr(request, '_cached_user'):
+        session = request.session
+        user = None
+        if session.get(BACKEND_SESSION_KEY) in settings.AUTHENTICATION_BACKENDS:
+            user_id, session_hash = session.get(SESSION_KEY), session.get(HASH_SESSION_KEY)
+            if user_id and session_hash:
+                user = cache.get(user_cache_key(user_id))
+                if user is not None and not constant_time_compare(session_hash, user.get_session_auth_hash()):
+                    user = None
+        if user is None:
+            user = auth.get_user(request)
+            if user.is_authenticated:
+                cache.set(user_cache_key(user.pk), user, settings.USER_CACHE_TIMEOUT)
+        request._cached_user = user
+    return request._cached_user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: get_cached_user(request))
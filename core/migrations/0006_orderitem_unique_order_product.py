@@ -0,0 +1,31 @@
+# Generated by Django 6.1.2 on 2026-10-19 18:11
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_order_items(apps, schema_editor):
+    # The old get_or_create in OrderItemView could race and add a product to an order twice:
+    # fold each group into its oldest row before the constraint goes on.
+    OrderItem = apps.get_model('core', 'OrderItem')
+    duplicates = OrderItem.objects.values('order', 'product').annotate(
+        rows=Count('id'), keep_id=Min('id'), total=Sum('quantity'),
+    ).filter(rows__gt=1)
+    for group in duplicates:
+        OrderItem.objects.filter(pk=group['keep_id']).update(quantity=group['total'])
+        OrderItem.objects.filter(order=group['order'], product=group['product']).exclude(pk=group['keep_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_post_featured_image'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_order_items, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='orderitem',
+            constraint=models.UniqueConstraint(fields=('order', 'product'), name='unique_order_product'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 6.1.2 on 2026-10-19 18:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_effective_price(apps, schema_editor):
+    Product = apps.get_model('core', 'Product')
+    Product.objects.filter(discounted_price__isnull=False).update(effective_price=models.F('discounted_price'))
+    Product.objects.filter(discounted_price__isnull=True).update(effective_price=models.F('original_price'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_product_stock_stockreservation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='effective_price',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=2, editable=False, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='promocode',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='promocode',
+            name='min_basket',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='promocode',
+            name='usage_limit',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='promocode',
+            name='used_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='Promotion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('percent_off', models.PositiveSmallIntegerField()),
+                ('starts_at', models.DateTimeField()),
+                ('ends_at', models.DateTimeField(blank=True, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('is_live', models.BooleanField(default=False, editable=False)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='promotions', to='core.productcategory')),
+                ('products', models.ManyToManyField(blank=True, related_name='promotions', to='core.product')),
+            ],
+        ),
+        migrations.RunPython(fill_effective_price, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 6.1.2 on 2026-10-19 18:24
+
+from django.db import migrations, models
+from django.db.models import Count, Sum, OuterRef, Subquery, IntegerField
+from django.db.models.functions import Coalesce
+
+
+def fill_ratings(apps, schema_editor):
+    Product = apps.get_model('core', 'Product')
+    CustomerReview = apps.get_model('core', 'CustomerReview')
+    reviews = CustomerReview.objects.filter(product_id=OuterRef('pk')).order_by().values('product_id')
+    Product.objects.update(
+        rating_count=Coalesce(Subquery(reviews.annotate(n=Count('id')).values('n'), output_field=IntegerField()), 0),
+        rating_sum=Coalesce(Subquery(reviews.annotate(n=Sum('rating')).values('n'), output_field=IntegerField()), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_post_updated_at_comment_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_ratings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 6.1.2 on 2026-10-19 18:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_product_rating_columns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderbilling',
+            name='paid_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='orderbilling',
+            name='rolled_up',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('dimension', models.CharField(choices=[('total', 'Total'), ('category', 'Category'), ('promocode', 'Promocode')], max_length=30)),
+                ('key', models.CharField(blank=True, max_length=255)),
+                ('label', models.CharField(blank=True, max_length=255)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('discount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('units', models.PositiveIntegerField(default=0)),
+                ('orders', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Daily Sales',
+                'constraints': [models.UniqueConstraint(fields=('day', 'dimension', 'key'), name='unique_daily_sales')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.1.2 on 2026-10-19 18:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customerreview',
+            index=models.Index(fields=['product_id', '-created_at', '-id'], name='review_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 6.1.2 on 2026-10-19 18:39
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def remove_duplicate_favourites(apps, schema_editor):
+    Favourite = apps.get_model('core', 'Favourite')
+    keep = Favourite.objects.values('product', 'user').annotate(keep_id=Min('id')).values('keep_id')
+    Favourite.objects.exclude(id__in=keep).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_review_keyset_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_favourites, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='favourite',
+            constraint=models.UniqueConstraint(fields=('product', 'user'), name='unique_favourite'),
+        ),
+    ]
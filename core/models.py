@@ -3,7 +3,8 @@ from math import ceil
 
 from django.contrib.auth.models import AbstractUser
 from django.db import models
-from django.db.models import EmailField, CharField, OneToOneField, Avg
+from django.db.models import EmailField, CharField, OneToOneField
+from django.utils.functional import cached_property
 
 from core.managers import CustomUserManager
 
@@ -51,21 +52,36 @@ class Product(models.Model):
     additional_information = models.TextField(null=True, blank=True)
     original_price = models.DecimalField(decimal_places=2, max_digits=10)
     discounted_price = models.DecimalField(decimal_places=2, max_digits=10, null=True, blank=True)
+    effective_price = models.DecimalField(decimal_places=2, max_digits=10, null=True, blank=True, editable=False, db_index=True)
     is_featured = models.BooleanField(default=False)
+    stock = models.PositiveIntegerField(null=True, blank=True, help_text='Leave empty to sell without stock tracking.')
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
 
     @property
     def review_count(self):
-        return self.reviews.count()
+        return self.rating_count
 
     @property
     def average_rating(self):
-        avg = self.reviews.aggregate(avg=Avg('rating'))['avg']
-        return range(1, int(avg or 0) + 1)
+        avg = self.rating_sum / self.rating_count if self.rating_count else 0
+        return range(1, int(avg) + 1)
+
+    @property
+    def price(self):
+        # Rows written by bulk_create or update() skip the pre_save hook and have no effective_price yet.
+        if self.effective_price is not None:
+            return self.effective_price
+        return self.discounted_price or self.original_price
+
+    @property
+    def has_discount(self):
+        return self.price < self.original_price
 
     @property
     def discount_percentage(self):
-        if self.discounted_price:
-            return ceil(((self.discounted_price - self.original_price) * 100) / self.original_price)
+        if self.has_discount:
+            return ceil(((self.original_price - self.price) * 100) / self.original_price)
 
     def __str__(self):
         return self.name
@@ -79,6 +95,11 @@ class ProductImage(models.Model):
 
 
 class CustomerReview(models.Model):
+    class Meta:
+        indexes = [
+            models.Index(fields=['product_id', '-created_at', '-id'], name='review_keyset_idx'),
+        ]
+
     text = models.CharField(max_length=255)
     rating = models.IntegerField()
     product_id = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reviews')
@@ -101,6 +122,20 @@ class ProductTags(models.Model):
     def __str__(self):
         return f"{self.product_id} - {self.tag_id.name}"
 
+class Promotion(models.Model):
+    name = models.CharField(max_length=255)
+    percent_off = models.PositiveSmallIntegerField()
+    category = models.ForeignKey(ProductCategory, on_delete=models.CASCADE, null=True, blank=True, related_name='promotions')
+    products = models.ManyToManyField(Product, blank=True, related_name='promotions')
+    starts_at = models.DateTimeField()
+    ends_at = models.DateTimeField(null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+    # Whether effective prices currently include this promotion; flipped by core.pricing.sync_promotions
+    is_live = models.BooleanField(default=False, editable=False)
+
+    def __str__(self):
+        return self.name
+
 class Country(models.Model):
     name = models.CharField(max_length=255)
 
@@ -130,10 +165,17 @@ class OrderBilling(models.Model):
     payment_status = models.CharField(choices=PaymentStatus, max_length=30)
     saveAsDefaultAdress = models.BooleanField(default=False)
     payment_reference = models.CharField(max_length=255)
+    idempotency_key = models.CharField(max_length=64, unique=True, null=True, blank=True)
+    paid_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    rolled_up = models.BooleanField(default=False, editable=False)
 
 class Promocode(models.Model):
     code = models.CharField(max_length=255)
     discount_percent = models.IntegerField()
+    min_basket = models.DecimalField(decimal_places=2, max_digits=10, default=0)
+    expires_at = models.DateTimeField(null=True, blank=True)
+    usage_limit = models.PositiveIntegerField(null=True, blank=True)
+    used_count = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.code
@@ -143,45 +185,72 @@ class Order(models.Model):
     order_billing = models.ForeignKey(OrderBilling, on_delete=models.SET_NULL, null=True, blank=True, related_name='orders_billing')
     promocode = models.ForeignKey(Promocode, on_delete=models.SET_NULL, null=True, blank=True, related_name='orders_promocode')
 
-    @property
+    # Cached: coupon_discount and grand_total build on it, and templates show all three.
+    # Load the order through core.cart.open_order so the items and products come prefetched.
+    @cached_property
     def total_price(self):
         total = 0
         for item in self.order_items.all():
-            if item.product.discounted_price:
-                total += item.product.discounted_price * item.quantity
+            if item.unit_price is not None:
+                total += item.unit_price * item.quantity
             else:
-                total += item.product.original_price * item.quantity
+                total += item.product.price * item.quantity
         return total
 
     @property
     def coupon_discount(self):
         if self.promocode:
-            discount = (self.total_price * Decimal(self.coupon.percent_off)) / Decimal(100)
-            return discount
+            discount = (self.total_price * Decimal(self.promocode.discount_percent)) / Decimal(100)
+            return discount.quantize(Decimal('0.01'))
         return Decimal(0)
 
+    @property
+    def grand_total(self):
+        return self.total_price - self.coupon_discount
+
     def __str__(self):
         return f"{self.id} - {self.user.username}"
 
 class OrderItem(models.Model):
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['order', 'product'], name='unique_order_product'),
+        ]
+
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='order_items')
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='order_product_items')
     quantity = models.IntegerField(default=1)
+    unit_price = models.DecimalField(decimal_places=2, max_digits=10, null=True, blank=True)
 
     def __str__(self):
         return f"{self.id} - {self.product.name}"
 
+class StockReservation(models.Model):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_reservations')
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, null=True, blank=True, related_name='stock_reservations')
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.product_id} - {self.quantity}"
+
 class Post(models.Model):
     title = models.CharField(max_length=255)
     description = models.TextField()
     category = models.ForeignKey(PostCategory, on_delete=models.SET_NULL, null=True, blank=True, related_name='posts')
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     featured_image = models.ImageField(upload_to='post_images', null=True, blank=True)
 
     def __str__(self):
         return self.title
 
 class Favourite(models.Model):
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'user'], name='unique_favourite'),
+        ]
+
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='favourites')
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='favourite_user')
 
@@ -189,6 +258,11 @@ class Favourite(models.Model):
         return self.product.name
 
 class PostComment(models.Model):
+    class Meta:
+        indexes = [
+            models.Index(fields=['post', '-created_at', '-id'], name='post_comment_keyset_idx'),
+        ]
+
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comments')
     text = models.TextField()
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='comment_user')
@@ -202,4 +276,64 @@ class PostTags(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='post_tags')
 
     def __str__(self):
-        return f"{self.post.title} - {self.tag.name}"
\ No newline at end of file
+        return f"{self.post.title} - {self.tag.name}"
+
+class Task(models.Model):
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        RUNNING = 'running', 'Running'
+        DONE = 'done', 'Done'
+        FAILED = 'failed', 'Failed'
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', '-priority', 'run_at'], name='task_queue_idx'),
+        ]
+
+    name = models.CharField(max_length=255)
+    payload = models.JSONField(default=dict, blank=True)
+    priority = models.SmallIntegerField(default=0)
+    status = models.CharField(choices=Status, max_length=30, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_at = models.DateTimeField()
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.id} - {self.name} - {self.status}"
+
+class DailySales(models.Model):
+    class Dimension(models.TextChoices):
+        TOTAL = 'total', 'Total'
+        CATEGORY = 'category', 'Category'
+        PROMOCODE = 'promocode', 'Promocode'
+
+    class Meta:
+        verbose_name_plural = 'Daily Sales'
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'dimension', 'key'], name='unique_daily_sales'),
+        ]
+
+    day = models.DateField()
+    dimension = models.CharField(choices=Dimension, max_length=30)
+    key = models.CharField(max_length=255, blank=True)
+    label = models.CharField(max_length=255, blank=True)
+    revenue = models.DecimalField(decimal_places=2, max_digits=14, default=0)
+    discount = models.DecimalField(decimal_places=2, max_digits=14, default=0)
+    units = models.PositiveIntegerField(default=0)
+    orders = models.PositiveIntegerField(default=0)
+
+    @property
+    def net_revenue(self):
+        return self.revenue - self.discount
+
+    @property
+    def average_order_value(self):
+        if self.orders:
+            return (self.net_revenue / self.orders).quantize(Decimal('0.01'))
+        return Decimal(0)
+
+    def __str__(self):
+        return f"{self.day} - {self.dimension} - {self.label}"
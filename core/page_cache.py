@@ -0,0 +1,87 @@
+import hashlib
+from functools import wraps
+
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+# Rendered in place of the CSRF token so one cached body serves every anonymous visitor;
+# the visitor's own token is swapped in on the way out.
+CSRF_PLACEHOLDER = 'csrf-token-placeholder-b6f1d0'
+TAG_KEY = 'page-tag:{}'
+CATALOG = 'catalog'
+VARY_HEADERS = ('HTTP_ACCEPT_LANGUAGE',)
+
+
+def csrf_placeholder(request):
+    """Context processor: overrides the builtin csrf_token while a cacheable page renders."""
+    if getattr(request, 'csrf_placeholder', False):
+        return {'csrf_token': CSRF_PLACEHOLDER}
+    return {}
+
+
+def purge_tag(tag):
+    """Invalidate every page cached under `tag` by moving the tag to a new version."""
+    key = TAG_KEY.format(tag)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def _page_key(request, tags):
+    tag_keys = [TAG_KEY.format(tag) for tag in tags]
+    versions = cache.get_many(tag_keys)
+    parts = [request.build_absolute_uri()]
+    parts += [request.META.get(header, '') for header in VARY_HEADERS]
+    parts += [f'{key}={versions.get(key, 0)}' for key in tag_keys]
+    return 'page:' + hashlib.md5('|'.join(parts).encode()).hexdigest()
+
+
+def _cacheable(request):
+    # Pending flash messages would be rendered into the page, so those requests skip the cache.
+    return request.method == 'GET' and not request.user.is_authenticated and not len(get_messages(request))
+
+
+def cache_anonymous_page(timeout=300, tags=()):
+    """
+    Cache the full response for anonymous GETs, keyed on URL, VARY_HEADERS and the versions of
+    `tags`. Logged-in users and requests with pending messages always get a fresh render.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not _cacheable(request):
+                return view(request, *args, **kwargs)
+
+            key = _page_key(request, tags)
+            cached = cache.get(key)
+            if cached is None:
+                request.csrf_placeholder = True
+                response = view(request, *args, **kwargs)
+                if callable(getattr(response, 'render', None)):
+                    response = response.render()
+                request.csrf_placeholder = False
+                if response.streaming:
+                    return response
+                status = 'miss'
+                if response.status_code == 200 and not response.cookies:
+                    cache.set(key, (response.content, response['Content-Type']), timeout)
+                else:
+                    status = 'skip'
+            else:
+                content, content_type = cached
+                response = HttpResponse(content, content_type=content_type)
+                status = 'hit'
+
+            response.content = response.content.replace(CSRF_PLACEHOLDER.encode(), get_token(request).encode())
+            if status != 'skip':
+                # The body carries this visitor's CSRF token: browsers may keep it, shared caches may not.
+                patch_cache_control(response, private=True, no_cache=True)
+                patch_vary_headers(response, ['Cookie'] + [h[5:].replace('_', '-').title() for h in VARY_HEADERS])
+                response['X-Page-Cache'] = status
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta, timezone
+
+from django.db.models import Q
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+MAX_PK = 2 ** 63 - 1
+
+
+def _encode(value, pk):
+    return f'{(value - EPOCH) // MICROSECOND}_{pk}'
+
+
+def _decode(cursor):
+    # Cursors come from the query string: anything out of range raises ValueError like a malformed one.
+    micros, pk = cursor.split('_')
+    pk = int(pk)
+    if not 0 < pk <= MAX_PK:
+        raise ValueError(cursor)
+    try:
+        return EPOCH + int(micros) * MICROSECOND, pk
+    except OverflowError:
+        raise ValueError(cursor)
+
+
+def keyset_page(queryset, cursor=None, page_size=10, field='created_at'):
+    """
+    Newest-first page of `queryset` starting after `cursor`. Returns (items, next_cursor),
+    next_cursor is None on the last page. Unlike OFFSET, deep pages cost the same as the first.
+    """
+    if cursor:
+        try:
+            value, pk = _decode(cursor)
+        except ValueError:
+            pass
+        else:
+            queryset = queryset.filter(Q(**{f'{field}__lt': value}) | Q(**{field: value, 'pk__lt': pk}))
+    return keyset_slice(list(queryset.order_by(f'-{field}', '-pk')[:page_size + 1]), page_size, field)
+
+
+def keyset_slice(items, page_size=10, field='created_at'):
+    """(items, next_cursor) for rows already fetched newest-first, page_size + 1 of them when there are more."""
+    if len(items) <= page_size:
+        return items, None
+    items = items[:page_size]
+    return items, _encode(getattr(items[-1], field), items[-1].pk)
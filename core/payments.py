@@ -0,0 +1,46 @@
+import time
+import uuid
+
+from django.db import transaction
+from django.utils import timezone
+
+from core.analytics import record_sale
+from core.models import OrderBilling
+from core.queue import enqueue
+
+
+class LocalStubProvider:
+    """Stand-in for a real payment gateway: waits a little and approves every charge."""
+
+    latency = 0.5
+
+    def charge(self, billing):
+        time.sleep(self.latency)
+        return f'stub_{uuid.uuid5(uuid.NAMESPACE_OID, billing.idempotency_key or str(billing.pk)).hex}'
+
+
+provider = LocalStubProvider()
+
+
+def confirm_payment(billing_id):
+    billing = OrderBilling.objects.filter(pk=billing_id, payment_status=OrderBilling.PaymentStatus.PENDING).first()
+    if billing is None:
+        return
+    try:
+        reference = provider.charge(billing)
+    except Exception:
+        status, reference = OrderBilling.PaymentStatus.REJECTED, ''
+    else:
+        status = OrderBilling.PaymentStatus.COMPLETED
+    with transaction.atomic():
+        # Only a still-pending billing moves on, so a duplicate confirmation is a no-op.
+        updated = OrderBilling.objects.filter(pk=billing_id, payment_status=OrderBilling.PaymentStatus.PENDING).update(
+            payment_status=status, payment_reference=reference,
+            paid_at=timezone.now() if status == OrderBilling.PaymentStatus.COMPLETED else None,
+        )
+        if updated and status == OrderBilling.PaymentStatus.COMPLETED:
+            record_sale(billing_id)
+
+
+def submit_payment(billing_id):
+    enqueue('confirm_payment', priority=10, billing_id=billing_id)
@@ -0,0 +1,114 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from core.models import Product, Promotion
+from core.page_cache import purge_tag, CATALOG
+
+CENT = Decimal('0.01')
+
+
+class PromocodeError(Exception):
+    pass
+
+
+def compute_effective_price(product, percent_off=0):
+    price = product.discounted_price or product.original_price
+    if percent_off:
+        promo_price = (Decimal(product.original_price) * (100 - percent_off) / 100).quantize(CENT)
+        price = min(price, promo_price)
+    return price
+
+
+def _live_discounts():
+    # Best live percent_off per product and per category.
+    by_product, by_category = {}, {}
+    for promotion in Promotion.objects.filter(is_live=True).prefetch_related('products'):
+        if promotion.category_id:
+            by_category[promotion.category_id] = max(by_category.get(promotion.category_id, 0), promotion.percent_off)
+        for product in promotion.products.all():
+            by_product[product.pk] = max(by_product.get(product.pk, 0), promotion.percent_off)
+    return by_product, by_category
+
+
+def price_for(product):
+    """Effective price of a single product, for saves that touch one row."""
+    # No clause for a missing category: category=None would match every product-list promotion.
+    q = Q()
+    if product.pk:
+        q |= Q(products=product.pk)
+    if product.category_id_id:
+        q |= Q(category=product.category_id_id)
+    percent_off = 0
+    if q:
+        percent_off = max(
+            Promotion.objects.filter(is_live=True).filter(q).values_list('percent_off', flat=True),
+            default=0,
+        )
+    return compute_effective_price(product, percent_off)
+
+
+def recalculate_effective_prices(products=None, batch_size=1000):
+    """Recompute effective_price for `products` (default: the whole catalog), writing only changed rows."""
+    by_product, by_category = _live_discounts()
+    products = Product.objects.all() if products is None else products
+    changed, updated = [], 0
+    for product in products.only('id', 'original_price', 'discounted_price', 'category_id', 'effective_price') \
+            .iterator(chunk_size=batch_size):
+        percent_off = max(by_product.get(product.pk, 0), by_category.get(product.category_id_id, 0))
+        price = compute_effective_price(product, percent_off)
+        if price != product.effective_price:
+            product.effective_price = price
+            changed.append(product)
+        if len(changed) >= batch_size:
+            updated += Product.objects.bulk_update(changed, ['effective_price'])
+            changed = []
+    if changed:
+        updated += Product.objects.bulk_update(changed, ['effective_price'])
+    if updated:
+        # bulk_update sends no signals.
+        purge_tag(CATALOG)
+    return updated
+
+
+def promotion_products(promotions):
+    return Product.objects.filter(
+        Q(promotions__in=promotions) | Q(category_id__in=[p.category_id for p in promotions if p.category_id])
+    ).distinct()
+
+
+def sync_promotions(now=None):
+    """
+    Go live with promotions whose window has started and retire the ones that ended,
+    then reprice only the products they cover. Meant to run on a schedule.
+    """
+    now = now or timezone.now()
+    running = Q(is_active=True, starts_at__lte=now) & (Q(ends_at__isnull=True) | Q(ends_at__gt=now))
+    with transaction.atomic():
+        starting = list(Promotion.objects.select_for_update().filter(running, is_live=False))
+        ending = list(Promotion.objects.select_for_update().filter(~running, is_live=True))
+        if not starting and not ending:
+            return 0
+        Promotion.objects.filter(pk__in=[p.pk for p in starting]).update(is_live=True)
+        Promotion.objects.filter(pk__in=[p.pk for p in ending]).update(is_live=False)
+        return recalculate_effective_prices(promotion_products(starting + ending))
+
+
+def validate_promocode(promocode, subtotal):
+    if promocode.expires_at and promocode.expires_at <= timezone.now():
+        raise PromocodeError(f'Promo code {promocode.code} has expired.')
+    if promocode.usage_limit is not None and promocode.used_count >= promocode.usage_limit:
+        raise PromocodeError(f'Promo code {promocode.code} is no longer available.')
+    if subtotal < promocode.min_basket:
+        raise PromocodeError(f'Promo code {promocode.code} needs a basket of at least ${promocode.min_basket}.')
+
+
+def redeem_promocode(promocode):
+    """Count one use, refusing atomically once the usage limit is reached."""
+    redeemed = type(promocode).objects.filter(pk=promocode.pk).filter(
+        Q(usage_limit__isnull=True) | Q(used_count__lt=F('usage_limit'))
+    ).update(used_count=F('used_count') + 1)
+    if not redeemed:
+        raise PromocodeError(f'Promo code {promocode.code} is no longer available.')
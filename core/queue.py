@@ -0,0 +1,128 @@
+import logging
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import timedelta
+
+from django.db import close_old_connections
+from django.utils import timezone
+
+from core.models import Task
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+RETRY_DELAY = 10  # seconds, doubled on every failed attempt
+LOCK_TIMEOUT = timedelta(minutes=10)
+
+
+def task(name=None, max_attempts=3):
+    """Register a function as a task the worker can run: `@task()` or `@task('name')`."""
+    def decorator(func):
+        func.task_name = name or func.__name__
+        func.max_attempts = max_attempts
+        _registry[func.task_name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, *, priority=0, delay=0, **payload):
+    """
+    Queue a task by name. The row is written in the caller's transaction, so a task
+    enqueued by a view that rolls back never runs.
+
+    Web processes don't import core.tasks, so the stored max_attempts is only a hint;
+    the worker goes by the registered task (see max_attempts_for).
+    """
+    func = _registry.get(name)
+    return Task.objects.create(
+        name=name,
+        payload=payload,
+        priority=priority,
+        max_attempts=func.max_attempts if func else 3,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def max_attempts_for(task_obj):
+    func = _registry.get(task_obj.name)
+    return func.max_attempts if func else task_obj.max_attempts
+
+
+def reclaim_stale(now):
+    """
+    Tasks locked for longer than LOCK_TIMEOUT were abandoned by a crashed worker (or are still
+    running, very slowly). Either way that counts as an attempt, so a task that keeps killing
+    the worker or outlives the lock ends up failed instead of running again and again.
+    """
+    for task_obj in Task.objects.filter(status=Task.Status.RUNNING, locked_at__lt=now - LOCK_TIMEOUT):
+        attempts = task_obj.attempts + 1
+        max_attempts = max_attempts_for(task_obj)
+        failed = attempts >= max_attempts
+        logger.warning('Task %s (%s) held its lock past %s, attempt %s', task_obj.pk, task_obj.name, LOCK_TIMEOUT, attempts)
+        Task.objects.filter(pk=task_obj.pk, status=Task.Status.RUNNING, locked_at=task_obj.locked_at).update(
+            status=Task.Status.FAILED if failed else Task.Status.PENDING,
+            attempts=attempts,
+            max_attempts=max_attempts,
+            run_at=now + timedelta(seconds=RETRY_DELAY * 2 ** (attempts - 1)),
+            locked_at=None,
+            last_error=f'Lock expired after {LOCK_TIMEOUT}.',
+        )
+
+
+def claim(limit):
+    """Mark up to `limit` due tasks as running and return them, highest priority first."""
+    now = timezone.now()
+    reclaim_stale(now)
+
+    candidates = Task.objects.filter(status=Task.Status.PENDING, run_at__lte=now) \
+        .order_by('-priority', 'run_at').values_list('pk', flat=True)[:limit]
+    claimed = []
+    for pk in candidates:
+        # Conditional update, so two workers never claim the same task.
+        if Task.objects.filter(pk=pk, status=Task.Status.PENDING).update(status=Task.Status.RUNNING, locked_at=now):
+            claimed.append(pk)
+    return list(Task.objects.filter(pk__in=claimed).order_by('-priority', 'run_at'))
+
+
+def run_task(task_obj):
+    close_old_connections()
+    try:
+        func = _registry[task_obj.name]
+        func(**task_obj.payload)
+    except Exception:
+        attempts = task_obj.attempts + 1
+        max_attempts = max_attempts_for(task_obj)
+        failed = attempts >= max_attempts
+        logger.exception('Task %s (%s) failed, attempt %s', task_obj.pk, task_obj.name, attempts)
+        Task.objects.filter(pk=task_obj.pk).update(
+            status=Task.Status.FAILED if failed else Task.Status.PENDING,
+            attempts=attempts,
+            max_attempts=max_attempts,
+            run_at=timezone.now() + timedelta(seconds=RETRY_DELAY * 2 ** (attempts - 1)),
+            locked_at=None,
+            last_error=traceback.format_exc(),
+        )
+    else:
+        Task.objects.filter(pk=task_obj.pk).update(status=Task.Status.DONE, attempts=task_obj.attempts + 1, locked_at=None)
+    finally:
+        close_old_connections()
+
+
+def run_worker(concurrency=4, poll_interval=1.0, once=False):
+    """Run tasks on a thread pool until interrupted (or until the queue is drained with `once`)."""
+    running = set()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='task-worker') as pool:
+        while True:
+            free = concurrency - len(running)
+            tasks = claim(free) if free else []
+            for task_obj in tasks:
+                running.add(pool.submit(run_task, task_obj))
+            if once and not tasks and not running:
+                return
+            if running:
+                done, running = wait(running, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                running = set(running)
+            elif not tasks:
+                time.sleep(poll_interval)
@@ -0,0 +1,27 @@
+from django.db import transaction
+from django.db.models import Count, Sum, OuterRef, Subquery, IntegerField, F
+from django.db.models.functions import Coalesce
+
+from core.models import Product, CustomerReview
+from core.page_cache import purge_tag, CATALOG
+
+
+def refresh_ratings(product_ids):
+    """Recount the denormalized rating columns of the given products from their reviews."""
+    reviews = CustomerReview.objects.filter(product_id=OuterRef('pk')).order_by().values('product_id')
+    Product.objects.filter(pk__in=product_ids).update(
+        rating_count=Coalesce(Subquery(reviews.annotate(n=Count('id')).values('n'), output_field=IntegerField()), 0),
+        rating_sum=Coalesce(Subquery(reviews.annotate(n=Sum('rating')).values('n'), output_field=IntegerField()), 0),
+    )
+    purge_tag(CATALOG)
+
+
+def add_review(review):
+    """Save a new review and fold its rating into the product's counters without recounting."""
+    with transaction.atomic():
+        review.save()
+        Product.objects.filter(pk=review.product_id_id).update(
+            rating_count=F('rating_count') + 1, rating_sum=F('rating_sum') + review.rating,
+        )
+        transaction.on_commit(lambda: purge_tag(CATALOG))
+    return review
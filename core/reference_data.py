@@ -0,0 +1,63 @@
+import time
+from types import MappingProxyType
+
+from django.core.cache import cache
+
+from core.models import Country, OrderBilling
+
+VERSION_KEY = 'reference-data-version'
+BILLING_KEY = 'billing-address:{}'
+BILLING_FIELDS = ('first_name', 'last_name', 'address', 'address_2', 'country_id', 'state', 'zip',
+                  'is_shipping_address_same', 'payment_type', 'saveAsDefaultAdress')
+PAYMENT_TYPES = tuple(OrderBilling.PaymentType.choices)
+
+# Upper bound on staleness if an invalidation is missed, e.g. with a per-process cache backend.
+SNAPSHOT_TTL = 300
+BILLING_TIMEOUT = 3600
+
+# (version, loaded_at, countries) for this worker. Rebuilt when VERSION_KEY moves or SNAPSHOT_TTL
+# passes, so checkout pages cost one cache read instead of a Country query. With a shared cache
+# (see CACHE_BACKEND) every worker picks up admin edits on its next request.
+_snapshot = (None, 0, None)
+
+
+class Countries:
+    def __init__(self, rows):
+        self.choices = tuple(rows)
+        self.names = MappingProxyType(dict(rows))
+
+
+def bump_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, None)
+
+
+def countries():
+    global _snapshot
+    version, now = cache.get(VERSION_KEY, 0), time.monotonic()
+    if _snapshot[0] != version or now - _snapshot[1] > SNAPSHOT_TTL:
+        _snapshot = (version, now, Countries(Country.objects.order_by('name').values_list('pk', 'name')))
+    return _snapshot[2]
+
+
+def country_choices():
+    return (('', '---------'), *countries().choices)
+
+
+def billing_initial(billing_id):
+    """The form values of a saved billing address, as a dict; cached by id until edited or BILLING_TIMEOUT."""
+    key = BILLING_KEY.format(billing_id)
+    initial = cache.get(key)
+    if initial is None:
+        values = OrderBilling.objects.filter(pk=billing_id).values(*BILLING_FIELDS).first()
+        if values is None:
+            return {}
+        initial = {field: values[field] for field in BILLING_FIELDS}
+        cache.set(key, initial, BILLING_TIMEOUT)
+    return dict(initial)
+
+
+def forget_billing(billing_id):
+    cache.delete(BILLING_KEY.format(billing_id))
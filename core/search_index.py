@@ -0,0 +1,246 @@
+import heapq
+import threading
+import time
+import unicodedata
+import uuid
+from bisect import bisect_left, insort
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.db.models import Count
+
+# Every change is written to its own version slot so other workers can replay it instead of
+# rebuilding. VERSION_KEY points at (roughly) the newest slot; GENERATION_KEY changes when the
+# cache is cleared and the log with it.
+VERSION_KEY = 'search-index-version'
+CHANGE_KEY = 'search-index-change:{}'
+GENERATION_KEY = 'search-index-generation'
+CHANGE_TIMEOUT = 3600
+MAX_REPLAY = 1000
+REPLAY_LOOKAHEAD = 8
+STALE_AFTER = 300
+MAX_LIMIT = 20
+# Prefixes matching more keys than this get their ranking memoized instead of re-ranked per query.
+MEMO_MIN_MATCHES = 500
+
+
+def normalize(text):
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode()
+    return ' '.join(text.lower().split())
+
+
+def terms_for(label):
+    # The whole name plus each word after the first, so "Green Apple" matches "gre" and "app".
+    name = normalize(label)
+    words = name.split()
+    return {name, *(' '.join(words[i:]) for i in range(1, len(words)))}
+
+
+class PrefixIndex:
+    """
+    In-memory type-ahead index: a sorted array of (term, kind, pk) keys searched with bisect.
+    Entries carry a popularity used to rank matches; rankings of broad prefixes are memoized
+    and patched in place when entries change.
+    """
+
+    def __init__(self):
+        self._keys = []
+        self._entries = {}
+        self._top = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def bulk_load(self, entries):
+        """Replace the contents with (kind, pk, label, popularity) tuples in one sort."""
+        keys, stored = [], {}
+        for kind, pk, label, popularity in entries:
+            terms = terms_for(label)
+            stored[(kind, pk)] = (label, popularity, terms)
+            keys.extend((term, kind, pk) for term in terms)
+        keys.sort()
+        with self._lock:
+            self._keys, self._entries, self._top = keys, stored, {}
+
+    def add(self, kind, pk, label, popularity=None):
+        key = (kind, pk)
+        with self._lock:
+            if popularity is None:
+                popularity = self._entries.get(key, (None, 0))[1]
+            self._remove(key)
+            terms = terms_for(label)
+            for term in terms:
+                insort(self._keys, (term, kind, pk))
+            self._entries[key] = (label, popularity, terms)
+            for prefix, top in self._top.items():
+                if any(term.startswith(prefix) for term in terms):
+                    if len(top) < MAX_LIMIT or popularity > self._entries[top[-1]][1]:
+                        top.append(key)
+                        top.sort(key=lambda k: self._entries[k][1], reverse=True)
+                        del top[MAX_LIMIT:]
+
+    def remove(self, kind, pk):
+        with self._lock:
+            self._remove((kind, pk))
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry:
+            for term in entry[2]:
+                i = bisect_left(self._keys, (term, *key))
+                if i < len(self._keys) and self._keys[i] == (term, *key):
+                    del self._keys[i]
+            for prefix in [prefix for prefix, top in self._top.items() if key in top]:
+                del self._top[prefix]
+
+    def _rank(self, prefix):
+        keys, entries = self._keys, self._entries
+        lo = bisect_left(keys, (prefix,))
+        hi = bisect_left(keys, (prefix + '\uffff',), lo)
+        matches = {(kind, pk) for term, kind, pk in keys[lo:hi]}
+        top = heapq.nlargest(MAX_LIMIT, matches, key=lambda key: entries[key][1])
+        if hi - lo > MEMO_MIN_MATCHES:
+            self._top[prefix] = top
+        return top
+
+    def warm(self, max_length=2):
+        """Memoize rankings of the broad prefixes up front, so no request pays for ranking thousands of matches."""
+        with self._lock:
+            prefixes = {term[:length] for term, kind, pk in self._keys for length in range(1, max_length + 1)}
+            for prefix in sorted(prefixes):
+                if prefix not in self._top:
+                    self._rank(prefix)
+        return len(self._top)
+
+    def search(self, prefix, limit=10):
+        """Up to `limit` (kind, pk, label) matches for `prefix`, most popular first."""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        with self._lock:
+            top = self._top.get(prefix)
+            if top is None:
+                top = self._rank(prefix)
+            return [(kind, pk, self._entries[(kind, pk)][0]) for kind, pk in top[:limit]]
+
+
+_index = None
+_version = None
+_generation = None
+_built_at = 0
+_built_version = 0
+_build_lock = threading.Lock()
+
+
+def catalog_entries():
+    from core.models import Product, ProductCategory, Tag
+
+    for pk, name, popularity in Product.objects.annotate(popularity=Count('order_product_items')) \
+            .values_list('pk', 'name', 'popularity').iterator(chunk_size=2000):
+        yield 'product', pk, name, popularity
+    for pk, name, popularity in ProductCategory.objects.annotate(popularity=Count('products')) \
+            .values_list('pk', 'name', 'popularity'):
+        yield 'category', pk, name, popularity
+    for pk, name, popularity in Tag.objects.annotate(popularity=Count('product_tags')) \
+            .values_list('pk', 'name', 'popularity'):
+        yield 'tag', pk, name, popularity
+
+
+def _atomic_add():
+    # FileBasedCache.add is a has_key() then a write, so two writers can both claim the same slot.
+    return not isinstance(caches['default'], FileBasedCache)
+
+
+def _log_state():
+    """(generation, head, next change present) in one cache round-trip."""
+    next_key = CHANGE_KEY.format((_version or 0) + 1)
+    values = cache.get_many([GENERATION_KEY, VERSION_KEY, next_key])
+    generation = values.get(GENERATION_KEY)
+    if generation is None:
+        # Missing after a cache clear or eviction: the log is gone too, so everyone rebuilds once.
+        cache.add(GENERATION_KEY, uuid.uuid4().hex, None)
+        generation = cache.get(GENERATION_KEY)
+    return generation, values.get(VERSION_KEY, 0), next_key in values
+
+
+def _replay(index, start, head):
+    """
+    Apply the changes after `start` from the cache and return the last version applied, or None
+    if the log can't bridge the gap (expired entries, or more than MAX_REPLAY behind). VERSION_KEY
+    is only a hint, so this reads a few slots past it.
+    """
+    if head - start > MAX_REPLAY:
+        return None
+    keys = [CHANGE_KEY.format(version) for version in range(start + 1, max(head, start) + REPLAY_LOOKAHEAD + 1)]
+    changes = cache.get_many(keys)
+    version = start
+    for key in keys:
+        if key not in changes:
+            break
+        kind, pk, label = changes[key]
+        if label is None:
+            index.remove(kind, pk)
+        else:
+            index.add(kind, pk, label)
+        version += 1
+    return version if version >= head else None
+
+
+def get_index():
+    """
+    The worker's index. Changes made by other processes are replayed from the cache; the whole
+    index is only reloaded on first use, after a cache clear, or when the log can't bridge the gap.
+    Without an atomic cache.add (FileBasedCache) any change triggers a reload, and a reload is
+    forced every STALE_AFTER seconds once the log has moved, to recover changes lost to a claim race.
+    """
+    global _version
+    generation, head, pending = _log_state()
+    current = _index is not None and generation == _generation and head <= _version and not pending
+    if current and not _atomic_add() and head > _built_version and time.monotonic() - _built_at > STALE_AFTER:
+        current = False
+    if not current:
+        with _build_lock:
+            version = None
+            if _index is not None and generation == _generation and _atomic_add():
+                version = _replay(_index, _version, head)
+            if version is None:
+                _rebuild(generation, head)
+            else:
+                _version = version
+    return _index
+
+
+def _rebuild(generation, head):
+    global _index, _version, _generation, _built_at, _built_version
+    # Changes logged while the catalog loads are replayed next time; index.add/remove are idempotent.
+    index = PrefixIndex()
+    index.bulk_load(catalog_entries())
+    _index, _version, _generation = index, head, generation
+    _built_at, _built_version = time.monotonic(), head
+
+
+def _record_change(kind, pk, label):
+    global _version
+    version = cache.get(VERSION_KEY, 0) + 1
+    # Each version slot is claimed with cache.add, so concurrent writers never overwrite each other's change.
+    while not cache.add(CHANGE_KEY.format(version), (kind, pk, label), CHANGE_TIMEOUT):
+        version += 1
+    if cache.get(VERSION_KEY, 0) < version:
+        cache.set(VERSION_KEY, version, None)
+    # Already applied here; only skip ahead if nothing from other processes is pending.
+    with _build_lock:
+        if _index is not None and _version == version - 1:
+            _version = version
+
+
+def index_object(kind, pk, label):
+    if _index is not None:
+        _index.add(kind, pk, label)
+    _record_change(kind, pk, label)
+
+
+def unindex_object(kind, pk):
+    if _index is not None:
+        _index.remove(kind, pk)
+    _record_change(kind, pk, None)
@@ -0,0 +1,93 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save, pre_delete, m2m_changed
+from django.dispatch import receiver
+
+from core.middleware import user_cache_key
+from core.models import User, Product, Promotion, ProductCategory, Tag, ProductTags, Country, OrderBilling
+from core.page_cache import purge_tag, CATALOG
+from core.pricing import price_for, promotion_products, recalculate_effective_prices, sync_promotions
+from core.reference_data import bump_version, forget_billing
+from core.search_index import index_object, unindex_object
+
+SEARCH_KINDS = {Product: 'product', ProductCategory: 'category', Tag: 'tag'}
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    cache.delete(user_cache_key(instance.pk))
+
+
+@receiver(pre_save, sender=Product)
+def set_effective_price(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or {'original_price', 'discounted_price', 'category_id'} & set(update_fields):
+        instance.effective_price = price_for(instance)
+
+
+def _reprice_on_commit(product_ids):
+    product_ids = set(product_ids)
+    transaction.on_commit(lambda: recalculate_effective_prices(Product.objects.filter(pk__in=product_ids)))
+
+
+@receiver(pre_save, sender=Promotion)
+def reprice_old_category(sender, instance, **kwargs):
+    # Products of the category the promotion is moving away from need their price restored.
+    if instance.pk:
+        old_category_id = Promotion.objects.filter(pk=instance.pk).values_list('category_id', flat=True).first()
+        if old_category_id and old_category_id != instance.category_id:
+            _reprice_on_commit(Product.objects.filter(category_id=old_category_id).values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Promotion)
+def reprice_promotion_products(sender, instance, **kwargs):
+    def reprice():
+        sync_promotions()
+        recalculate_effective_prices(promotion_products([instance]))
+    transaction.on_commit(reprice)
+
+
+@receiver(m2m_changed, sender=Promotion.products.through)
+def reprice_promotion_members(sender, instance, action, pk_set, **kwargs):
+    if action in ('post_add', 'post_remove'):
+        _reprice_on_commit(pk_set)
+    elif action == 'pre_clear':
+        _reprice_on_commit(instance.products.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=Promotion)
+def reprice_deleted_promotion(sender, instance, **kwargs):
+    _reprice_on_commit(promotion_products([instance]).values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=ProductCategory)
+@receiver(post_save, sender=Tag)
+def update_search_index(sender, instance, **kwargs):
+    transaction.on_commit(lambda: index_object(SEARCH_KINDS[sender], instance.pk, instance.name))
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=ProductCategory)
+@receiver(post_delete, sender=Tag)
+def remove_from_search_index(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: unindex_object(SEARCH_KINDS[sender], pk))
+
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=ProductCategory)
+@receiver([post_save, post_delete], sender=Tag)
+@receiver([post_save, post_delete], sender=ProductTags)
+@receiver([post_save, post_delete], sender=Promotion)
+def purge_catalog_pages(sender, **kwargs):
+    transaction.on_commit(lambda: purge_tag(CATALOG))
+
+
+@receiver([post_save, post_delete], sender=Country)
+def refresh_reference_data(sender, **kwargs):
+    transaction.on_commit(bump_version)
+
+
+@receiver([post_save, post_delete], sender=OrderBilling)
+def forget_cached_billing(sender, instance, **kwargs):
+    forget_billing(instance.pk)
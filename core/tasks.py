@@ -0,0 +1,74 @@
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.mail import EmailMessage, get_connection, send_mail
+from PIL import Image
+
+from core.inventory import release_expired
+from core.models import Subscription, Product
+from core.page_cache import purge_tag, CATALOG
+from core.payments import confirm_payment
+from core.pricing import sync_promotions
+from core.queue import task
+from core.warmup import warm_caches
+
+NEWSLETTER_BATCH_SIZE = 500
+MAX_IMAGE_SIZE = (1200, 1200)
+
+task()(confirm_payment)
+task('release_expired_reservations')(release_expired)
+task()(sync_promotions)
+task()(warm_caches)
+
+
+@task()
+def send_welcome_email(subscription_id):
+    subscription = Subscription.objects.filter(pk=subscription_id).first()
+    if subscription:
+        send_mail(
+            'Welcome to Organic',
+            f'Hi {subscription.name}, thanks for subscribing to our newsletter!',
+            settings.DEFAULT_FROM_EMAIL,
+            [subscription.email],
+        )
+
+
+@task(max_attempts=1)
+def send_newsletter(subject, body):
+    # Stream subscribers in batches over a single SMTP connection.
+    sent = 0
+    with get_connection() as connection:
+        batch = []
+        for email in Subscription.objects.values_list('email', flat=True).iterator(chunk_size=NEWSLETTER_BATCH_SIZE):
+            batch.append(EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, [email], connection=connection))
+            if len(batch) >= NEWSLETTER_BATCH_SIZE:
+                sent += connection.send_messages(batch) or 0
+                batch = []
+        if batch:
+            sent += connection.send_messages(batch) or 0
+    return sent
+
+
+@task()
+def process_product_image(product_id):
+    product = Product.objects.filter(pk=product_id).only('featured_image').first()
+    if not product or not product.featured_image:
+        return
+    with product.featured_image.open('rb') as f:
+        image = Image.open(f)
+        image.load()
+    if image.width <= MAX_IMAGE_SIZE[0] and image.height <= MAX_IMAGE_SIZE[1]:
+        return
+    image_format = image.format
+    image.thumbnail(MAX_IMAGE_SIZE)
+    content = ContentFile(b'')
+    image.save(content, format=image_format)
+    # Save alongside the original and switch the row over before deleting anything, so a failed
+    # save or a retry never finds the image gone. The storage picks a free name for the copy.
+    storage, old_name = product.featured_image.storage, product.featured_image.name
+    new_name = storage.save(old_name, content)
+    if Product.objects.filter(pk=product_id, featured_image=old_name).update(featured_image=new_name):
+        storage.delete(old_name)
+        purge_tag(CATALOG)
+    else:
+        # The image was replaced while we worked on it.
+        storage.delete(new_name)
@@ -1,3 +1,195 @@
+from datetime import timedelta
+
+from django.db import transaction
 from django.test import TestCase
+from django.utils import timezone
+
+from core.checkout import place_order, CheckoutError
+from core.inventory import reserve, commit_reservations, release_expired, OutOfStock
+from core.models import User, Product, Order, OrderItem, OrderBilling, Task, StockReservation, CustomerReview
+from core.pagination import keyset_page
+
+
+def make_product(sku, stock=None, price=10):
+    return Product.objects.create(name=sku, sku=sku, description='', original_price=price, featured_image='x.png', stock=stock)
+
+
+def make_billing():
+    return OrderBilling(first_name='Ada', last_name='Lovelace', address='1 Main St', state='CA', zip='90000',
+                        payment_type=OrderBilling.PaymentType.PAYPAL)
+
+
+class PlaceOrderTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='ada@example.com', password='secret')
+        self.product = make_product('apple')
+        self.order = Order.objects.create(user=self.user)
+        OrderItem.objects.create(order=self.order, product=self.product, quantity=2)
+
+    def test_places_order_and_queues_payment(self):
+        billing = place_order(self.user, make_billing(), 'key-1')
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.order_billing, billing)
+        self.assertEqual(billing.payment_status, OrderBilling.PaymentStatus.PENDING)
+        self.assertEqual(self.order.order_items.get().unit_price, 10)
+        self.assertTrue(Task.objects.filter(name='confirm_payment', payload={'billing_id': billing.pk}).exists())
+
+    def test_resubmitting_the_same_key_returns_the_first_billing(self):
+        first = place_order(self.user, make_billing(), 'key-1')
+        again = place_order(self.user, make_billing(), 'key-1')
+        self.assertEqual(again, first)
+        self.assertEqual(OrderBilling.objects.count(), 1)
+        self.assertEqual(Task.objects.filter(name='confirm_payment').count(), 1)
+
+    def test_another_users_key_does_not_return_their_billing(self):
+        place_order(self.user, make_billing(), 'key-1')
+        other = User.objects.create_user(email='bob@example.com', password='secret')
+        other_order = Order.objects.create(user=other)
+        OrderItem.objects.create(order=other_order, product=self.product, quantity=1)
+
+        with self.assertRaises(CheckoutError):
+            place_order(other, make_billing(), 'key-1')
+        other_order.refresh_from_db()
+        self.assertIsNone(other_order.order_billing)
+
+    def test_empty_cart(self):
+        self.order.order_items.all().delete()
+        with self.assertRaisesMessage(CheckoutError, 'Your cart is empty.'):
+            place_order(self.user, make_billing(), 'key-1')
+        self.assertFalse(OrderBilling.objects.exists())
+
+    def test_out_of_stock_rolls_back_the_checkout(self):
+        tracked = make_product('pear', stock=5)
+        sold_out = make_product('plum', stock=0)
+        OrderItem.objects.create(order=self.order, product=tracked, quantity=3)
+        OrderItem.objects.create(order=self.order, product=sold_out, quantity=1)
+
+        with self.assertRaisesMessage(CheckoutError, 'plum is out of stock'):
+            place_order(self.user, make_billing(), 'key-1')
+
+        tracked.refresh_from_db()
+        self.order.refresh_from_db()
+        self.assertEqual(tracked.stock, 5)
+        self.assertIsNone(self.order.order_billing)
+        self.assertFalse(OrderBilling.objects.exists())
+        self.assertFalse(Task.objects.exists())
+
+
+class InventoryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='ada@example.com', password='secret')
+        self.order = Order.objects.create(user=self.user)
+        self.product = make_product('pear', stock=10)
+
+    def stock(self, product):
+        product.refresh_from_db()
+        return product.stock
+
+    def test_reserve_takes_stock(self):
+        reservation = reserve(self.product.pk, 4, self.order)
+        self.assertEqual(reservation.quantity, 4)
+        self.assertEqual(self.stock(self.product), 6)
+
+    def test_reserve_more_than_left_raises_and_takes_nothing(self):
+        with self.assertRaises(OutOfStock):
+            reserve(self.product.pk, 11, self.order)
+        self.assertEqual(self.stock(self.product), 10)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_untracked_products_are_not_reserved(self):
+        untracked = make_product('salt')
+        self.assertIsNone(reserve(untracked.pk, 100, self.order))
+        self.assertIsNone(self.stock(untracked))
+
+    def test_release_expired_returns_stock(self):
+        reserve(self.product.pk, 3, self.order)
+        reserve(self.product.pk, 2, self.order)
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(release_expired(), 2)
+        self.assertEqual(self.stock(self.product), 10)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_checkout_tops_up_reaped_holds(self):
+        reserve(self.product.pk, 3, self.order)
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(minutes=1))
+        release_expired()
+        item = OrderItem.objects.create(order=self.order, product=self.product, quantity=3)
+
+        commit_reservations(self.order, [item])
+        self.assertEqual(self.stock(self.product), 7)
+
+    def test_checkout_tops_up_short_holds(self):
+        reserve(self.product.pk, 1, self.order)
+        item = OrderItem.objects.create(order=self.order, product=self.product, quantity=4)
+
+        commit_reservations(self.order, [item])
+        self.assertEqual(self.stock(self.product), 6)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_checkout_returns_surplus_holds(self):
+        other = make_product('plum', stock=5)
+        reserve(self.product.pk, 5, self.order)
+        reserve(other.pk, 2, self.order)
+        # The pear line was reduced and the plum line removed after reserving.
+        item = OrderItem.objects.create(order=self.order, product=self.product, quantity=2)
+
+        commit_reservations(self.order, [item])
+        self.assertEqual(self.stock(self.product), 8)
+        self.assertEqual(self.stock(other), 5)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_out_of_stock_rolls_back_the_transaction(self):
+        sold_out = make_product('plum', stock=1)
+        reserve(self.product.pk, 2, self.order)
+        items = [
+            OrderItem.objects.create(order=self.order, product=self.product, quantity=5),
+            OrderItem.objects.create(order=self.order, product=sold_out, quantity=2),
+        ]
+
+        with self.assertRaises(OutOfStock) as raised, transaction.atomic():
+            commit_reservations(self.order, items)
+        self.assertEqual(raised.exception.product_id, sold_out.pk)
+        self.assertEqual(self.stock(self.product), 8)
+        self.assertEqual(self.stock(sold_out), 1)
+        self.assertEqual(StockReservation.objects.get().quantity, 2)
+
+
+class KeysetPageTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(email='ada@example.com', password='secret')
+        self.product = make_product('pear')
+        CustomerReview.objects.bulk_create([
+            CustomerReview(product_id=self.product, user_id=user, rating=5, text=f'review {i}') for i in range(7)
+        ])
+        # Five share a timestamp, so the id has to break ties.
+        now = timezone.now()
+        reviews = list(CustomerReview.objects.order_by('pk'))
+        for i, review in enumerate(reviews):
+            review.created_at = now if i < 5 else now + timedelta(seconds=i)
+        CustomerReview.objects.bulk_update(reviews, ['created_at'])
+        self.newest_first = [r.pk for r in CustomerReview.objects.order_by('-created_at', '-pk')]
+
+    def page(self, cursor=None, page_size=3):
+        items, next_cursor = keyset_page(CustomerReview.objects.all(), cursor, page_size)
+        return [item.pk for item in items], next_cursor
+
+    def test_pages_cover_every_row_once_across_ties(self):
+        seen, cursor = [], None
+        while True:
+            pks, cursor = self.page(cursor)
+            seen += pks
+            if cursor is None:
+                break
+        self.assertEqual(seen, self.newest_first)
+
+    def test_last_page_has_no_cursor(self):
+        pks, cursor = self.page(page_size=7)
+        self.assertEqual(len(pks), 7)
+        self.assertIsNone(cursor)
 
-# Create your tests here.
+    def test_bad_cursors_fall_back_to_the_first_page(self):
+        first, _ = self.page()
+        for cursor in ['nonsense', '1_2_3', 'x_1', '1_-5', '1_0',
+                       '99999999999999999999999_1', '-99999999999999999999999_1', '1_99999999999999999999999']:
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.page(cursor)[0], first)
@@ -1,15 +1,42 @@
+from importlib import import_module
+
 from django.urls import path
-from core.views import *
 
-from config import settings
+
+def lazy_view(name):
+    """
+    Import core.views when the route is first dispatched rather than when the URLconf loads, so
+    reverse() in workers and commands doesn't pull in every view, form and template helper.
+    """
+    view = None
+
+    def dispatch(request, *args, **kwargs):
+        nonlocal view
+        if view is None:
+            view = getattr(import_module('core.views'), name).as_view()
+        return view(request, *args, **kwargs)
+    return dispatch
+
 
 urlpatterns = [
-    path('', HomeTemplateView.as_view(), name='home'),
-    path('favourite/', FavouriteView.as_view(), name='favourite'),
-    path('add-to-cart/', OrderItemView.as_view(), name='add-to-cart'),
-    path('search/', SearchView.as_view(), name='search'),
-    path('subscription/', SubscriptionCreateView.as_view(), name='subscription'),
-    path('login/', LoginFormView.as_view(), name='login'),
-    path('register/', RegisterCreatView.as_view(), name='register'),
-    path('logout/', LogoutView.as_view(), name='logout'),
+    path('', lazy_view('HomeTemplateView'), name='home'),
+    path('favourites/', lazy_view('FavouriteListView'), name='favourites'),
+    path('favourites/sync/', lazy_view('FavouriteSyncView'), name='favourites-sync'),
+    path('favourites/<int:product_id>/', lazy_view('FavouriteView'), name='favourite'),
+    path('add-to-cart/', lazy_view('OrderItemView'), name='add-to-cart'),
+    path('shop/', lazy_view('ShopView'), name='shop'),
+    path('product/<int:pk>/', lazy_view('ProductDetailView'), name='product'),
+    path('product/<int:pk>/review/', lazy_view('ProductReviewView'), name='product-review'),
+    path('search/', lazy_view('SearchView'), name='search'),
+    path('search/suggest/', lazy_view('SearchSuggestView'), name='search-suggest'),
+    path('subscription/', lazy_view('SubscriptionCreateView'), name='subscription'),
+    path('login/', lazy_view('LoginFormView'), name='login'),
+    path('register/', lazy_view('RegisterCreatView'), name='register'),
+    path('logout/', lazy_view('LogoutView'), name='logout'),
+    path('blog/', lazy_view('BlogListView'), name='blog'),
+    path('blog/<int:pk>/', lazy_view('PostDetailView'), name='post'),
+    path('blog/<int:pk>/comment/', lazy_view('PostCommentView'), name='post-comment'),
+    path('checkout/', lazy_view('CheckoutView'), name='checkout'),
+    path('checkout/promocode/', lazy_view('PromocodeView'), name='promocode'),
+    path('thank-you/', lazy_view('ThankYouView'), name='thank-you'),
 ]
\ No newline at end of file
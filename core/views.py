@@ -1,17 +1,46 @@
+import json
+import uuid
+
 from django.contrib import messages
 from django.contrib.auth import logout, login
 from django.contrib.auth.hashers import check_password
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.shortcuts import render, redirect
-from django.urls import reverse_lazy
-from django.views.generic import ListView, CreateView, View, FormView
+from django.db.models import Count, Prefetch, Value
+from django.db.models.functions import Substr
+from django.http import JsonResponse
+from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse_lazy, reverse
+from django.utils.decorators import method_decorator
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.views.generic import ListView, CreateView, View, FormView, TemplateView, DetailView
 
-from core.forms import SubscriptionForm, LoginForm, RegisterModelForm
-from core.models import ProductCategory, Product, Favourite, Tag, OrderItem, Order, Post, Subscription, User
+from core.cart import GuestCart, open_order
+from core.checkout import place_order, CheckoutError
+from core.favourites import add_favourites, remove_favourites, sync_favourites, MAX_SYNC
+from core.facets import parse_filters, apply_filters, sidebar, SORTS
+from core.forms import SubscriptionForm, LoginForm, RegisterModelForm, CheckoutForm, PostCommentForm, \
+    CustomerReviewForm
+from core.inventory import reserve, OutOfStock
+from core.models import ProductCategory, Product, Favourite, Tag, OrderItem, Order, Post, Subscription, User, \
+    Promocode, ProductTags, CustomerReview
+from core.page_cache import cache_anonymous_page, CATALOG
+from core.pagination import keyset_page, keyset_slice
+from core.pricing import validate_promocode, PromocodeError
+from core.ratings import add_review
+from core.reference_data import billing_initial, PAYMENT_TYPES
+from core.queue import enqueue
+from core.search_index import get_index
 
+COMMENTS_PER_PAGE = 10
+REVIEWS_PER_PAGE = 10
 
-class HomeTemplateView(LoginRequiredMixin,ListView):
-    login_url = 'login'
+
+def post_cards():
+    # Listings only need a short excerpt, never the full CKEditor body.
+    return Post.objects.select_related('category').defer('description').annotate(excerpt=Substr('description', 1, 300))
+
+
+class HomeTemplateView(ListView):
     queryset = ProductCategory.objects.all()
     template_name = 'core/index.html'
     context_object_name = 'categories'
@@ -19,7 +48,7 @@ class HomeTemplateView(LoginRequiredMixin,ListView):
     def get_context_data(self, **kwargs):
         data = super().get_context_data(**kwargs)
         best_sellings = Product.objects.filter(is_featured=False)[:6]
-        user_favourites = Favourite.objects.filter(user=self.request.user)
+        user_favourites = Favourite.objects.filter(user_id=self.request.user.id)
         featured_products = Product.objects.filter(is_featured=True)
         arrived_products = Product.objects.all().order_by('-id')[:6]
         favourite_product_ids = user_favourites.values_list('product_id', flat=True)
@@ -30,18 +59,22 @@ class HomeTemplateView(LoginRequiredMixin,ListView):
         for product in arrived_products:
             product.is_liked = product.id in favourite_product_ids
 
-        latest_order = Order.objects.filter(user=self.request.user).order_by('-id').first()
+        if self.request.user.is_authenticated:
+            order = open_order(self.request.user)
+            data['latest_order'] = order
+            data['cart_items'] = order.order_items.all() if order else []
+        else:
+            cart = GuestCart.from_request(self.request)
+            data['latest_order'] = cart
+            data['cart_items'] = cart.order_items
         data['best_sellings'] = best_sellings
         data['tags'] = Tag.objects.all()
         data['featured_products'] = featured_products
-        data['latest_order'] = latest_order
-        data['cart_items'] = OrderItem.objects.select_related('order').select_related('product').filter(order__user=self.request.user)
         data['arrived_products'] = arrived_products
-        data['posts'] = Post.objects.select_related('category').all()
+        data['posts'] = post_cards().order_by('-created_at')[:3]
         return data
 
-class OrderItemView(LoginRequiredMixin, View):
-    login_url = 'login'
+class OrderItemView(View):
     def post(self, request):
         product_id = request.GET.get('product_id')
         quantity = int(request.POST.get('quantity', 1))
@@ -49,10 +82,26 @@ class OrderItemView(LoginRequiredMixin, View):
         if quantity <= 0:
             return redirect('home')
 
+        if not request.user.is_authenticated:
+            response = redirect('home')
+            if product_id and product_id.isdigit():
+                cart = GuestCart.from_request(request)
+                cart.add(int(product_id), quantity)
+                cart.save(response)
+            return response
+
         product = Product.objects.get(id=product_id)
 
         order, created = Order.objects.get_or_create(user=request.user, order_billing=None)
 
+        try:
+            reserve(product.id, quantity, order)
+        except OutOfStock:
+            # Re-read: the stock loaded above predates the failed conditional update.
+            left = Product.objects.filter(pk=product.pk).values_list('stock', flat=True).first() or 0
+            messages.error(request, f'Sorry, only {left} of {product.name} left in stock.')
+            return redirect('home')
+
         order_item, item_created = OrderItem.objects.get_or_create(order=order, product=product)
 
         if item_created:
@@ -63,33 +112,78 @@ class OrderItemView(LoginRequiredMixin, View):
         order_item.save()
         return redirect('home')
 
-class FavouriteView(LoginRequiredMixin,View):
+def _wants_json(request):
+    return 'application/json' in request.headers.get('Accept', '') or request.content_type == 'application/json'
+
+
+class FavouriteView(LoginRequiredMixin, View):
+    """POST adds, DELETE (or POST with action=remove from a plain form) removes; repeating either is harmless."""
     login_url = 'login'
-    def get(self, request):
-        product_id = request.GET.get('product_id')
-        query = Favourite.objects.filter(product_id=product_id, user=request.user)
-        if query.exists():
-            query = query.first()
-            query.delete()
-        else:
-            Favourite.objects.create(product_id=product_id, user=request.user)
+
+    def post(self, request, product_id):
+        if request.POST.get('action') == 'remove':
+            return self.delete(request, product_id)
+        add_favourites(request.user, [product_id])
+        return self.respond(request, product_id, True)
+
+    def delete(self, request, product_id):
+        remove_favourites(request.user, [product_id])
+        return self.respond(request, product_id, False)
+
+    def respond(self, request, product_id, liked):
+        if _wants_json(request):
+            return JsonResponse({'product_id': product_id, 'liked': liked})
+        referer = request.headers.get('Referer')
+        if referer and url_has_allowed_host_and_scheme(referer, {request.get_host()}, request.is_secure()):
+            return redirect(referer)
         return redirect('home')
 
-class SearchView(LoginRequiredMixin, View):
+
+class FavouriteSyncView(LoginRequiredMixin, View):
+    """Bulk update from a client-side wishlist: {"add": [...], "remove": [...]} or {"set": [...]}."""
     login_url = 'login'
+
+    def post(self, request):
+        try:
+            data = json.loads(request.body)
+            lists = {key: [int(pk) for pk in data.get(key) or []] for key in ('add', 'remove', 'set')}
+        except (ValueError, TypeError, AttributeError):
+            return JsonResponse({'error': 'Expected a JSON object with lists of product ids.'}, status=400)
+        if sum(len(ids) for ids in lists.values()) > MAX_SYNC:
+            return JsonResponse({'error': f'At most {MAX_SYNC} product ids per request.'}, status=400)
+        product_ids = sync_favourites(request.user, lists['add'], lists['remove'],
+                                      lists['set'] if 'set' in data else None)
+        return JsonResponse({'product_ids': product_ids})
+
+
+class FavouriteListView(LoginRequiredMixin, ListView):
+    login_url = 'login'
+    template_name = 'core/search_results.html'
+    context_object_name = 'best_sellings'
+
+    def get_queryset(self):
+        return Product.objects.filter(favourites__user=self.request.user).select_related('category_id') \
+            .annotate(is_liked=Value(True)).order_by('-favourites__id')
+
+    def get_context_data(self, **kwargs):
+        data = super().get_context_data(**kwargs)
+        data['categories'] = ProductCategory.objects.all()
+        data['heading'] = 'Your favourites'
+        return data
+
+
+@method_decorator(cache_anonymous_page(tags=[CATALOG]), name='get')
+class SearchView(View):
     def post(self, request):
         search = request.POST.get('search')
         category = request.POST.get('category')
-        user_favourites = Favourite.objects.filter(user=self.request.user)
+        user_favourites = Favourite.objects.filter(user_id=self.request.user.id)
         favourite_product_ids = user_favourites.values_list('product_id', flat=True)
-        if search and category == 'all':
-            products = Product.objects.select_related('category_id').filter(name__icontains=search)
-            print(products)
-        elif not search and category:
-            products = Product.objects.select_related('category_id').filter(category_id__name=category)
-        else:
-            products = Product.objects.select_related('category_id').filter(category_id__name=category, name__in=search)
-            print("second")
+        products = Product.objects.select_related('category_id')
+        if search:
+            products = products.filter(name__icontains=search)
+        if category and category.isdigit():
+            products = products.filter(category_id=category)
         for product in products:
             product.is_liked = product.id in favourite_product_ids
         categories = ProductCategory.objects.all()
@@ -97,7 +191,6 @@ class SearchView(LoginRequiredMixin, View):
             'best_sellings': products,
             'categories': categories,
         }
-        print(search, category)
         return render(request, 'core/search_results.html', context)
     def get(self, request):
         categories = ProductCategory.objects.all()
@@ -109,14 +202,98 @@ class SearchView(LoginRequiredMixin, View):
         return render(request, 'core/search_results.html', context)
 
 
+class ProductDetailView(DetailView):
+    template_name = 'core/single-product.html'
+    context_object_name = 'product'
+
+    def get_queryset(self):
+        products = Product.objects.select_related('category_id').prefetch_related(
+            'product_images', Prefetch('product_tags', queryset=ProductTags.objects.select_related('tag_id')),
+        )
+        if not self.request.GET.get('before'):
+            # First page of reviews in the same round of prefetches; the extra row tells whether there is a next page.
+            reviews = CustomerReview.objects.select_related('user_id').order_by('-created_at', '-id')
+            products = products.prefetch_related(
+                Prefetch('reviews', queryset=reviews[:REVIEWS_PER_PAGE + 1], to_attr='first_reviews')
+            )
+        return products
+
+    def get_context_data(self, **kwargs):
+        data = super().get_context_data(**kwargs)
+        if hasattr(self.object, 'first_reviews'):
+            data['reviews'], data['next_cursor'] = keyset_slice(self.object.first_reviews, REVIEWS_PER_PAGE)
+        else:
+            data['reviews'], data['next_cursor'] = keyset_page(
+                self.object.reviews.select_related('user_id'), self.request.GET.get('before'), REVIEWS_PER_PAGE
+            )
+        data['form'] = CustomerReviewForm()
+        data['is_liked'] = self.request.user.is_authenticated and \
+            Favourite.objects.filter(user=self.request.user, product=self.object).exists()
+        return data
+
+
+class ProductReviewView(LoginRequiredMixin, View):
+    login_url = 'login'
+    def post(self, request, pk):
+        product = get_object_or_404(Product.objects.only('id'), pk=pk)
+        form = CustomerReviewForm(request.POST)
+        if form.is_valid():
+            form.instance.product_id = product
+            form.instance.user_id = request.user
+            add_review(form.instance)
+        else:
+            messages.error(request, 'Please choose a rating and write a review.')
+        return redirect(reverse('product', args=[pk]) + '#reviews')
+
+
+class SearchSuggestView(View):
+    def get(self, request):
+        try:
+            limit = min(int(request.GET.get('limit', 8)), 20)
+        except ValueError:
+            limit = 8
+        results = get_index().search(request.GET.get('q', '')[:100], limit)
+        return JsonResponse({'results': [{'type': kind, 'id': pk, 'label': label} for kind, pk, label in results]})
+
+
+class ShopView(ListView):
+    template_name = 'core/shop.html'
+    context_object_name = 'products'
+    paginate_by = 20
+
+    def get_queryset(self):
+        self.filters = parse_filters(self.request.GET)
+        self.sort = self.request.GET.get('sort') if self.request.GET.get('sort') in SORTS else None
+        order = SORTS[self.sort][0] if self.sort else 'name'
+        products = apply_filters(Product.objects.select_related('category_id'), self.filters)
+        return products.order_by(order, 'id')
+
+    def get_context_data(self, **kwargs):
+        data = super().get_context_data(**kwargs)
+        favourite_product_ids = set(Favourite.objects.filter(user_id=self.request.user.id).values_list('product_id', flat=True))
+        for product in data['products']:
+            product.is_liked = product.id in favourite_product_ids
+        query = self.request.GET.copy()
+        query.pop('page', None)
+        data['facets'] = sidebar(self.filters, self.sort)
+        data['query'] = query.urlencode()
+        data['categories'] = ProductCategory.objects.all()
+        return data
+
+
 class SubscriptionCreateView(CreateView):
     model = Subscription
     form_class = SubscriptionForm
     template_name = 'core/index.html'
     success_url = reverse_lazy('home')
 
+    def form_valid(self, form):
+        response = super().form_valid(form)
+        enqueue('send_welcome_email', subscription_id=self.object.pk)
+        return response
 
 
+@method_decorator(cache_anonymous_page(tags=[CATALOG]), name='get')
 class RegisterCreatView(CreateView):
     queryset = User.objects.all()
     form_class = RegisterModelForm
@@ -130,6 +307,7 @@ class RegisterCreatView(CreateView):
         return data
 
 
+@method_decorator(cache_anonymous_page(tags=[CATALOG]), name='get')
 class LoginFormView(FormView):
     form_class = LoginForm
     template_name = 'core/login.html'
@@ -150,13 +328,16 @@ class LoginFormView(FormView):
             user = query.first()
             if check_password(users.get('password'), user.password):
                 login(self.request, user)
+                GuestCart.from_request(self.request).merge_into(user)
             else:
                 messages.error(self.request, 'Password incorrect!')
                 return redirect('login')
         else:
             messages.error(self.request, f'{users.get('email')} exist! ')
             return redirect('login')
-        return super().form_valid(form)
+        response = super().form_valid(form)
+        GuestCart.clear(response)
+        return response
     def form_invalid(self, form):
         messages.error(self.request, 'Invalid credentials!')
         return redirect('login')
@@ -165,3 +346,98 @@ class LogoutView(View):
     def get(self,request):
         logout(request)
         return redirect('login')
+
+
+class BlogListView(ListView):
+    template_name = 'core/blog.html'
+    context_object_name = 'posts'
+    paginate_by = 9
+
+    def get_queryset(self):
+        return post_cards().annotate(comment_count=Count('comments')).prefetch_related('post_tags__tag') \
+            .order_by('-created_at', '-id')
+
+
+class PostDetailView(DetailView):
+    template_name = 'core/single-post.html'
+    context_object_name = 'post'
+    # The body is loaded only when its cached fragment is missing, see single-post.html.
+    queryset = Post.objects.select_related('category').defer('description').prefetch_related('post_tags__tag') \
+        .annotate(comment_count=Count('comments'))
+
+    def get_context_data(self, **kwargs):
+        data = super().get_context_data(**kwargs)
+        data['comments'], data['next_cursor'] = keyset_page(
+            self.object.comments.select_related('user'), self.request.GET.get('before'), COMMENTS_PER_PAGE
+        )
+        data['form'] = PostCommentForm()
+        return data
+
+
+class PostCommentView(LoginRequiredMixin, View):
+    login_url = 'login'
+    def post(self, request, pk):
+        post = get_object_or_404(Post.objects.only('id'), pk=pk)
+        form = PostCommentForm(request.POST)
+        if form.is_valid():
+            form.instance.post = post
+            form.instance.user = request.user
+            form.save()
+        else:
+            messages.error(request, 'Comment can not be empty!')
+        return redirect('post', pk=pk)
+
+
+class CheckoutView(LoginRequiredMixin, FormView):
+    login_url = 'login'
+    form_class = CheckoutForm
+    template_name = 'core/checkout.html'
+    success_url = reverse_lazy('thank-you')
+
+    def get_initial(self):
+        initial = {'idempotency_key': uuid.uuid4().hex}
+        if self.request.user.billing_address_id:
+            initial.update(billing_initial(self.request.user.billing_address_id))
+        return initial
+
+    def get_context_data(self, **kwargs):
+        data = super().get_context_data(**kwargs)
+        order = open_order(self.request.user)
+        data['order'] = order
+        data['cart_items'] = order.order_items.all() if order else []
+        data['payment_types'] = PAYMENT_TYPES
+        return data
+
+    def form_valid(self, form):
+        try:
+            place_order(self.request.user, form.save(commit=False), form.cleaned_data['idempotency_key'])
+        except CheckoutError as e:
+            messages.error(self.request, str(e))
+            return redirect('checkout')
+        return super().form_valid(form)
+
+
+class PromocodeView(LoginRequiredMixin, View):
+    login_url = 'login'
+    def post(self, request):
+        code = request.POST.get('code', '').strip()
+        order = Order.objects.filter(user=request.user, order_billing=None).order_by('-id').first()
+        promocode = Promocode.objects.filter(code=code).first()
+        if order is None:
+            messages.error(request, 'Your cart is empty.')
+        elif promocode is None:
+            messages.error(request, f'Promo code {code} does not exist.')
+        else:
+            try:
+                validate_promocode(promocode, order.total_price)
+            except PromocodeError as e:
+                messages.error(request, str(e))
+            else:
+                order.promocode = promocode
+                order.save(update_fields=['promocode'])
+        return redirect('checkout')
+
+
+class ThankYouView(LoginRequiredMixin, TemplateView):
+    login_url = 'login'
+    template_name = 'core/thank-you.html'
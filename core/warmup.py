@@ -0,0 +1,10 @@
+from core.reference_data import countries
+from core.search_index import get_index
+
+
+def warm_caches():
+    """Fill the per-process caches a worker's first requests would otherwise pay for."""
+    index = get_index()
+    index.warm()
+    countries()
+    return len(index)
@@ -126,10 +126,33 @@
     });
   }
 
+  // type-ahead for the header search box
+  var initSearchSuggest = function() {
+    $('input[data-suggest-url]').each(function() {
+      var input = $(this);
+      var list = $('#' + input.attr('list'));
+      var timer;
+      input.on('input', function() {
+        clearTimeout(timer);
+        timer = setTimeout(function() {
+          var q = input.val();
+          if (!q) { list.empty(); return; }
+          $.getJSON(input.data('suggest-url'), {q: q}, function(data) {
+            list.empty();
+            $.each(data.results, function(i, result) {
+              list.append($('<option>').attr('value', result.label));
+            });
+          });
+        }, 150);
+      });
+    });
+  }
+
   // document ready
   $(document).ready(function() {
     
     initPreloader();
+    initSearchSuggest();
     initSwiper();
     initJarallax();
     initChocolat();